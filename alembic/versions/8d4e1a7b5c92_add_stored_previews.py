@@ -0,0 +1,31 @@
+"""Add stored previews to writeups and challenges
+
+The previews of existing rows are filled in by `poetry run backfill_previews`
+after upgrading, rather than here, so this migration doesn't depend on the
+renderer as it is today.
+
+Revision ID: 8d4e1a7b5c92
+Revises: 3f0b6c1d2e7a
+Create Date: 2026-10-18 11:24:37.093511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e1a7b5c92'
+down_revision = '3f0b6c1d2e7a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('writeups', sa.Column('preview', sa.Text(), server_default='', nullable=False))
+    op.add_column('challenges', sa.Column('preview', sa.Text(), server_default='', nullable=False))
+
+
+def downgrade():
+    op.drop_column('challenges', 'preview')
+    op.drop_column('writeups', 'preview')
@@ -66,3 +66,133 @@ def export_writeups():
         print(json.dumps([t_w(w) for w in writeups]))
 
     asyncio.run(inner())
+
+
+def backfill_previews():
+    """Recompute the stored previews of every writeup and challenge.
+
+    With `--incomplete`, only those stored as the fallback for going over the
+    site's render budget.
+    """
+    import asyncio
+
+    import sqlalchemy as sa
+
+    from luhack_bot.db.helpers import init_db
+    from luhack_bot.db.models import Challenge, Writeup, db, render_preview
+
+    incomplete = "--incomplete" in sys.argv[1:]
+
+    async def inner():
+        await init_db()
+
+        for model in (Writeup, Challenge):
+            query = db.select([model.id, model.content])
+            if incomplete:
+                query = query.where(sa.not_(model.preview_complete))
+            rows = await query.gino.all()
+
+            for (id, content) in rows:
+                await (
+                    model.update.values(
+                        preview=render_preview(content), preview_complete=True
+                    )
+                    .where(model.id == id)
+                    .gino.status()
+                )
+
+            print(f"Updated the previews of {len(rows)} {model.__tablename__}")
+
+    asyncio.run(inner())
+
+
+def rebuild_standings():
+    """Recompute the season standings from the solves, e.g. `rebuild_standings 5`."""
+    import asyncio
+
+    from luhack_bot.db.helpers import init_db
+    from luhack_bot.db.standings import rebuild_standings
+
+    season = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    async def inner():
+        await init_db()
+
+        rows = await rebuild_standings(season)
+
+        which = "every season" if season is None else f"season {season}"
+        print(f"Rebuilt {rows} standings for {which}")
+
+    asyncio.run(inner())
+
+
+def verify_previews():
+    """Check that every stored document gets the same preview from the early
+    stopping preview parser as from parsing the whole of it."""
+    import asyncio
+
+    from luhack_bot.db.helpers import init_db
+    from luhack_bot.db.models import Challenge, Writeup, db
+    from luhack_site.markdown import (
+        full_length_constrained_plaintext_markdown,
+        length_constrained_plaintext_markdown,
+    )
+
+    async def inner():
+        await init_db()
+
+        mismatches = 0
+
+        for model in (Writeup, Challenge):
+            rows = await db.select([model.id, model.content]).gino.all()
+
+            for (id, content) in rows:
+                preview = length_constrained_plaintext_markdown(content)
+
+                if preview != full_length_constrained_plaintext_markdown(content):
+                    mismatches += 1
+                    print(f"Preview of {model.__tablename__} {id} differs")
+
+            print(f"Checked the previews of {len(rows)} {model.__tablename__}")
+
+        return mismatches
+
+    if asyncio.run(inner()):
+        sys.exit(1)
+
+
+def verify_live_previews():
+    """Check that every stored document renders the same split into the live
+    preview's blocks as it does whole."""
+    import asyncio
+
+    from luhack_bot.db.helpers import init_db
+    from luhack_bot.db.models import Challenge, Writeup, db
+    from luhack_site.live_preview import render_blocks
+    from luhack_site.render_service import renderers
+
+    async def inner():
+        await init_db()
+
+        mismatches = 0
+
+        for model, renderer in (
+            (Writeup, "highlight"),
+            (Challenge, "highlight_unsafe"),
+        ):
+            rows = await db.select([model.id, model.content]).gino.all()
+
+            for (id, content) in rows:
+                blocks = render_blocks(renderer, content, frozenset())
+                joined = "".join(html for (_, html) in blocks)
+
+                if joined != renderers[renderer](content):
+                    mismatches += 1
+                    print(f"Live preview of {model.__tablename__} {id} differs")
+
+            print(f"Checked the live previews of {len(rows)} {model.__tablename__}")
+
+        return mismatches
+
+    if asyncio.run(inner()):
+        sys.exit(1)
@@ -1,4 +1,5 @@
 import logging
+import math
 import textwrap
 from datetime import datetime
 from typing import List, Literal, Optional, Tuple, TypeVar
@@ -11,9 +12,16 @@ from gino.loader import ColumnLoader
 from tabulate import tabulate
 
 from luhack_bot import constants
-from luhack_bot.db.helpers import text_search
+from luhack_bot.db.helpers import tag_counts, text_search
 from luhack_bot.db.models import Challenge, CompletedChallenge, User, db
+from luhack_bot.db.solves import (
+    SolveResult,
+    current_season,
+    record_solve,
+    set_current_season,
+)
 from luhack_bot.utils.checks import is_admin_int, is_authed, is_authed_int
+from luhack_bot.utils.rate_limit import flag_key, flag_limiter
 from luhack_bot.utils.list_sep_transform import ListSepTransformer, list_sep_choices
 
 logger = logging.getLogger(__name__)
@@ -64,14 +72,7 @@ async def title_autocomplete(
 async def tag_autocomplete(
     interaction: discord.Interaction, current: str
 ) -> list[app_commands.Choice[str]]:
-    tags = (
-        sa.select([sa.column("tag")])
-        .select_from(Challenge)
-        .select_from(sa.func.unnest(Challenge.tags).alias("tag"))
-        .group_by(sa.column("tag"))
-        .order_by(sa.func.count())
-        .cte("tags")
-    )
+    tags = tag_counts("challenge").cte("used_tags")
 
     if not current:
         results = await (
@@ -103,9 +104,6 @@ async def tag_autocomplete(
     return [app_commands.Choice(name=name, value=name) for name, in results]
 
 
-CURRENT_SEASON = 5
-
-
 def tag_url(tag):
     return constants.challenges_base_url / "tag" / tag
 
@@ -244,7 +242,7 @@ class Challenges(commands.GroupCog, name="challenge"):
         interaction: discord.Interaction,
         *,
         tag_condition: Optional[Literal["every", "any"]] = "every",
-        season: Optional[int] = CURRENT_SEASON,
+        season: Optional[int] = None,
         tags: Optional[app_commands.Transform[list[str], ListSepTransformer]],
     ):
         """View the most and lest solved challenges.
@@ -259,6 +257,9 @@ class Challenges(commands.GroupCog, name="challenge"):
         if tags is None:
             tags = []
 
+        if season is None:
+            season = await current_season()
+
         tag_filter = (
             Challenge.tags.contains
             if tag_condition == "every"
@@ -384,7 +385,7 @@ class Challenges(commands.GroupCog, name="challenge"):
         interaction: discord.Interaction,
         *,
         tag_condition: Optional[Literal["every", "any"]] = "every",
-        season: Optional[int] = CURRENT_SEASON,
+        season: Optional[int] = None,
         tags: Optional[app_commands.Transform[list[str], ListSepTransformer]],
     ):
         """View the leaderboard for completed challenges.
@@ -399,6 +400,9 @@ class Challenges(commands.GroupCog, name="challenge"):
         if tags is None:
             tags = []
 
+        if season is None:
+            season = await current_season()
+
         tag_filter = (
             Challenge.tags.contains
             if tag_condition == "every"
@@ -456,10 +460,13 @@ class Challenges(commands.GroupCog, name="challenge"):
         self,
         interaction: discord.Interaction,
         *,
-        season: Optional[int] = CURRENT_SEASON,
+        season: Optional[int] = None,
     ):
         """Get info about your solved and unsolved challenges."""
 
+        if season is None:
+            season = await current_season()
+
         solved_challenges = (
             db.select([CompletedChallenge.challenge_id])
             .where(CompletedChallenge.discord_id == interaction.user.id)
@@ -526,6 +533,26 @@ class Challenges(commands.GroupCog, name="challenge"):
         title: Optional[str] = None,
     ):
         """Claim a challenge or flag. You'll need to specify the challenge name if you're submitting a non flag answer."""
+        # before anything else, so that guesses are cheap to turn away: every
+        # claim takes from the user's bucket, and once the challenge is known
+        # also from the one the site uses for it, so the two share a budget
+        retry_after = await flag_limiter.acquire(flag_key(interaction.user.id))
+
+        challenge = None
+        if retry_after is None and title is not None:
+            challenge = await self.get_challenge(title)
+            if challenge is not None:
+                retry_after = await flag_limiter.acquire(
+                    flag_key(interaction.user.id, challenge.id)
+                )
+
+        if retry_after is not None:
+            await interaction.response.send_message(
+                f"You're submitting too quickly, try again in {math.ceil(retry_after)} seconds.",
+                ephemeral=True,
+            )
+            return
+
         flag = flag.strip()
 
         if title is None:
@@ -535,55 +562,29 @@ class Challenges(commands.GroupCog, name="challenge"):
                 .gino.first()
             )
 
-        else:
-            challenge = await self.get_challenge(title)
-
         if challenge is None:
             await interaction.response.send_message(
                 "That doesn't look to be a valid flag or answer.", ephemeral=True
             )
             return
 
-        if not (challenge.answer == flag or challenge.flag == flag):
-            # if this is an answer solve
-            await interaction.response.send_message(
-                "That isn't the correct answer, sorry.", ephemeral=True
-            )
-            return
+        result = await record_solve(interaction.user.id, challenge, flag)
 
-        if challenge.depreciated:
-            msg = textwrap.dedent(
+        msg = {
+            SolveResult.solved: f"Congrats, you've completed this challenge and have been awarded {challenge.points} points!",
+            SolveResult.incorrect: "That isn't the correct answer, sorry.",
+            SolveResult.depreciated: textwrap.dedent(
                 """
                 Congrats on completing the challenge!
 
                 Unfortunately you can no longer score points for this challenge because
                 a writeup has been released, or for other reasons.
                 """
-            )
-            await interaction.response.send_message(msg, ephemeral=True)
-            return
-
-        already_claimed = await CompletedChallenge.query.where(
-            (CompletedChallenge.discord_id == interaction.user.id)
-            & (CompletedChallenge.challenge_id == challenge.id)
-            & (CompletedChallenge.season == CURRENT_SEASON)
-        ).gino.first()
-
-        if already_claimed is not None:
-            await interaction.response.send_message(
-                "It looks like you've already claimed this flag.", ephemeral=True
-            )
-            return
+            ),
+            SolveResult.already_solved: "It looks like you've already claimed this flag.",
+        }[result]
 
-        await CompletedChallenge.create(
-            discord_id=interaction.user.id,
-            challenge_id=challenge.id,
-            season=CURRENT_SEASON,
-        )
-        await interaction.response.send_message(
-            f"Congrats, you've completed this challenge and have been awarded {challenge.points} points!",
-            ephemeral=True,
-        )
+        await interaction.response.send_message(msg, ephemeral=True)
 
 
 @app_commands.guild_only()
@@ -639,6 +640,7 @@ class ChallengeAdmin(commands.GroupCog, name="challenge_admin"):
             "depreciate": {"depreciated": True},
             "undepreciate": {"depreciated": False},
         }[op]
+        update["edit_date"] = sa.func.now()
 
         (r, _) = (
             await Challenge.update.values(**update)
@@ -649,6 +651,24 @@ class ChallengeAdmin(commands.GroupCog, name="challenge_admin"):
 
         await interaction.response.send_message(f"Updated {r} challenges")
 
+    @app_commands.command(name="season")
+    @app_commands.describe(
+        season="The season to switch to, leave out to see the current season"
+    )
+    async def season(self, interaction: discord.Interaction, season: Optional[int] = None):
+        """View or change the season that challenge solves count towards."""
+        if season is None:
+            await interaction.response.send_message(
+                f"The current season is {await current_season()}"
+            )
+            return
+
+        await set_current_season(season)
+
+        await interaction.response.send_message(
+            f"Solves now count towards season {season}, the site will follow within a minute"
+        )
+
     @app_commands.command(name="announce")
     @app_commands.describe(op="Operation to perform")
     @app_commands.describe(
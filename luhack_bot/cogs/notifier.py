@@ -23,9 +23,11 @@ class Notifier(commands.Cog):
     def handle_message(self, conn, pid, chan, msg):
         msg = orjson.loads(msg)
 
-        coro = {"challenge_complete": self.handle_challenge_complete}[msg["type"]](msg)
+        handler = {"challenge_complete": self.handle_challenge_complete}.get(msg["type"])
 
-        asyncio.create_task(coro)
+        # other listeners (the site) are notified of things we don't announce
+        if handler is not None:
+            asyncio.create_task(handler(msg))
 
     async def handle_challenge_complete(self, msg):
         luhack = self.bot.luhack_guild()
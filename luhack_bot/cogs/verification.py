@@ -7,6 +7,7 @@ import textwrap
 from typing import TYPE_CHECKING, Optional
 
 import discord
+from asyncpg.exceptions import UniqueViolationError
 from discord import app_commands
 from discord.ext import commands
 from discord.ext import tasks
@@ -14,6 +15,7 @@ from discord.ext import tasks
 from luhack_bot import constants
 from luhack_bot import email_tools
 from luhack_bot import token_tools
+from luhack_bot.crypto import email_blind_index
 from luhack_bot.db.models import User
 from luhack_bot.utils.checks import (
     is_admin_int,
@@ -68,8 +70,7 @@ class Verification(commands.GroupCog, name="verify"):
         return is_in_luhack_int(interaction)
 
     async def apply_roles(self, member: discord.Member):
-        user = await User.get(member.id)
-        if user is not None:
+        if await User.is_verified(member.id):
             await member.add_roles(self.bot.verified_role())
             await member.remove_roles(
                 self.bot.potential_role(), self.bot.prospective_role()
@@ -99,7 +100,7 @@ class Verification(commands.GroupCog, name="verify"):
 
     @tasks.loop(hours=24)
     async def update_members(self):
-        users = await User.query.gino.all()
+        users = await User.load_public().query.gino.all()
         for user in users:
             member = self.bot.luhack_guild().get_member(user.discord_id)
             if member is None:
@@ -157,8 +158,9 @@ class Verification(commands.GroupCog, name="verify"):
                     email = corrected
 
         user_id = interaction.user.id
-        existing_user = await User.query.where(
-            (User.discord_id == user_id) | (User.email == email)
+        existing_user = await User.load_public().where(
+            (User.discord_id == user_id)
+            | (User.email_hash == email_blind_index(email))
         ).gino.first()
 
         if existing_user and existing_user.discord_id != user_id:
@@ -192,9 +194,7 @@ class Verification(commands.GroupCog, name="verify"):
         Second step on the path to Grand Master Cyber Wizard.
         """
         user_id = interaction.user.id
-        existing_user = await User.get(user_id)
-
-        if existing_user is not None:
+        if await User.is_verified(user_id):
             raise commands.CheckFailure("It seems you've already registered.")
 
         user = token_tools.decode_auth_token(auth_token)
@@ -217,16 +217,22 @@ class Verification(commands.GroupCog, name="verify"):
 
         logger.info("Verifying member: %s", interaction.user)
 
+        try:
+            user = await User.create_auto(
+                discord_id=user_id, username=member.name, email=user_email
+            )
+        except UniqueViolationError:
+            # someone else verified with the same email since the token was sent
+            raise commands.CheckFailure(
+                "Looks like someone's already registered with this email address."
+            )
+
         await interaction.response.send_message(
             "Permissions granted, you can now access all of the discord channels. You are now on the path to Grand Master Cyber Wizard!",
             ephemeral=True,
         )
         await self.bot.log_message(f"verified member {member} ({member.id})")
 
-        user = await User.create(
-            discord_id=user_id, username=member.name, email=user_email
-        )
-
         await member.remove_roles(self.bot.potential_role())
         await member.add_roles(self.bot.verified_role())
 
@@ -251,7 +257,21 @@ class VerificationAdmin(commands.GroupCog, name="verify_admin"):
         """Manually auth a member."""
         logger.info("Verifying member: %s", member)
 
-        await User.create(discord_id=member.id, username=member.name, email=email)
+        try:
+            await User.create_auto(
+                discord_id=member.id, username=member.name, email=email
+            )
+        except UniqueViolationError:
+            existing = await User.load_public().where(
+                (User.discord_id == member.id)
+                | (User.email_hash == email_blind_index(email))
+            ).gino.first()
+            await interaction.response.send_message(
+                f"Couldn't verify {member}, they or that email are already registered"
+                + (f" (as <@{existing.discord_id}>)" if existing else ""),
+                ephemeral=True,
+            )
+            return
 
         await member.remove_roles(self.bot.potential_role())
         await member.add_roles(self.bot.verified_role())
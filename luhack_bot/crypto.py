@@ -1,5 +1,21 @@
+import hashlib
+import hmac
+
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 from luhack_bot.secrets import email_encryption_key
 
 fernet = Fernet(email_encryption_key)
+
+_blind_index_key = HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b"email blind index"
+).derive(email_encryption_key.encode())
+
+
+def email_blind_index(email: str) -> str:
+    """Keyed hash of a normalised email, used to look up users by their email
+    without decrypting every row."""
+    normalised = email.strip().lower()
+    return hmac.new(_blind_index_key, normalised.encode(), hashlib.sha256).hexdigest()
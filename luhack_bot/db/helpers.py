@@ -2,7 +2,7 @@ import sqlalchemy as sa
 from sqlalchemy_searchable import inspect_search_vectors, search_manager
 from sqlalchemy_utils import TSVectorType
 
-from luhack_bot.db.models import db
+from luhack_bot.db.models import Tag, db
 from luhack_bot.secrets import db_url
 
 
@@ -50,3 +50,20 @@ def text_search(query, search_query, vector=None, regconfig=None, sort=False):
         )
 
     return query.params(term=search_query)
+
+
+def tag_counts(kind: str, include_private: bool = False):
+    """Select the tags of `kind` that are in use, along with their usage count.
+
+    :param kind: either "writeup" or "challenge"
+    :param include_private: count private writeups/hidden challenges too
+    """
+    count = Tag.public_count
+    if include_private:
+        count = count + Tag.private_count
+
+    return (
+        db.select([Tag.tag, count.label("count")])
+        .where(Tag.kind == kind)
+        .where(count > 0)
+    )
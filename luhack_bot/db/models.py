@@ -1,14 +1,105 @@
+from typing import Set
+
+import sqlalchemy as sa
+from asyncpg.exceptions import UniqueViolationError
 from gino import Gino
+from gino.exceptions import NoSuchRowError
+from luhack_bot.crypto import email_blind_index
 from luhack_bot.secrets import email_encryption_key
 from slug import slug
 from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
 from sqlalchemy.orm import backref, relationship
 from sqlalchemy_utils import EncryptedType
 from sqlalchemy_utils.types import TSVectorType
 
 db = Gino()
 
+
+def render_preview(content: str) -> str:
+    """Render the plaintext teaser shown on listing pages."""
+    # imported here so the bot doesn't need the site's renderers at import time
+    from luhack_site.markdown import length_constrained_plaintext_markdown
+
+    return length_constrained_plaintext_markdown(content)
+
+
+class ContentConflict(Exception):
+    """A writeup or challenge clashed with the unique columns of another."""
+
+    def __init__(self, columns: Set[str]):
+        super().__init__(f"Conflicts on: {', '.join(sorted(columns))}")
+
+        #: names of the unique columns that clashed, may be empty if the other
+        #: row has since gone away
+        self.columns = columns
+
+
+async def _conflicting_columns(model, values: dict, id=None) -> Set[str]:
+    """Find which of the unique columns in `values` are taken by another row."""
+    unique = [
+        c
+        for c in model.__table__.columns
+        if c.unique and values.get(c.name) is not None
+    ]
+    clashes = [c == values[c.name] for c in unique]
+
+    query = db.select(clashes).where(sa.or_(*clashes))
+    if id is not None:
+        query = query.where(model.id != id)
+
+    rows = await query.gino.all()
+
+    return {c.name for row in rows for (c, clash) in zip(unique, row) if clash}
+
+
+async def _insert_unique(model, values: dict):
+    """Insert a row of `model`, raising `ContentConflict` if it clashes.
+
+    This is a single INSERT .. ON CONFLICT DO NOTHING, the clashing columns
+    are only looked up when it does clash.
+    """
+    row = await (
+        insert(model.__table__)
+        .values(**values)
+        .on_conflict_do_nothing()
+        .returning(*model.__table__.columns)
+        .gino.load(model)
+        .first()
+    )
+
+    if row is None:
+        raise ContentConflict(await _conflicting_columns(model, values))
+
+    return row
+
+
+async def _update_unique(row, values: dict):
+    """Update `row`, raising `ContentConflict` if it clashes with another.
+
+    `row` only takes on the new values once they're saved, `row.update()`
+    would set them before, leaving a rejected title or flag on it.
+    """
+    model = type(row)
+
+    try:
+        updated = await (
+            model.update.values(**values)
+            .where(model.id == row.id)
+            .returning(*[getattr(model, key) for key in values])
+            .gino.load(model)
+            .first()
+        )
+    except UniqueViolationError:
+        raise ContentConflict(await _conflicting_columns(model, values, row.id))
+
+    if updated is None:
+        raise NoSuchRowError()
+
+    for key in values:
+        setattr(row, key, getattr(updated, key))
+
+
 class User(db.Model):
     """Full users, that have a lancs email."""
 
@@ -17,6 +108,8 @@ class User(db.Model):
     discord_id = db.Column(db.BigInteger(), primary_key=True)
     username = db.Column(db.Text(), nullable=False)
     email = db.Column(EncryptedType(db.Text(), email_encryption_key), nullable=False)
+    #: `email_blind_index` of the email, so users can be found by email
+    email_hash = db.Column(db.Text(), nullable=True, unique=True)
     #: when the user became verified, not when they joined the guild
     joined_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
 
@@ -26,6 +119,27 @@ class User(db.Model):
         "Challenge", secondary=lambda: CompletedChallenge, back_populates="challenges"
     )
 
+    @classmethod
+    def create_auto(cls, *args, **kwargs):
+        if "email_hash" not in kwargs:
+            kwargs["email_hash"] = email_blind_index(kwargs["email"])
+        return cls.create(*args, **kwargs)
+
+    @classmethod
+    def load_public(cls):
+        """Load users without their email, which saves decrypting it for each row."""
+        return cls.load(cls.discord_id, cls.username, cls.joined_at, cls.is_admin)
+
+    @classmethod
+    def get_public(cls, discord_id: int):
+        return cls.load_public().where(cls.discord_id == discord_id).gino.first()
+
+    @classmethod
+    async def is_verified(cls, discord_id: int) -> bool:
+        return await db.select(
+            [sa.exists().where(cls.discord_id == discord_id)]
+        ).gino.scalar()
+
 
 class Writeup(db.Model):
     __tablename__ = "writeups"
@@ -43,6 +157,14 @@ class Writeup(db.Model):
 
     tags = db.Column(ARRAY(db.Text()), nullable=False)
     content = db.Column(db.Text(), nullable=False)
+    #: plaintext teaser of the content, see `render_preview`
+    preview = db.Column(db.Text(), nullable=False, server_default="")
+    #: false if `preview` is only the escaped fallback for content that went
+    #: over the render budget, `backfill_previews --incomplete` fills them in
+    preview_complete = db.Column(db.Boolean(), nullable=False, server_default=sa.true())
+    #: rendered html of the content, valid only while `rendered_key` matches
+    rendered_html = db.Column(db.Text(), nullable=True)
+    rendered_key = db.Column(db.Text(), nullable=True)
 
     creation_date = db.Column(db.DateTime, server_default=func.now(), nullable=False)
     edit_date = db.Column(
@@ -59,17 +181,38 @@ class Writeup(db.Model):
     private = db.Column(db.Boolean, nullable=False, default=False)
 
     _tags_idx = db.Index("writeups_tags_array_idx", "tags", postgresql_using="gin")
+    _title_trgm_idx = db.Index(
+        "writeups_title_trgm_idx",
+        "title",
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    _listing_idx = db.Index("writeups_creation_date_id_idx", "creation_date", "id")
+    _public_listing_idx = db.Index(
+        "writeups_public_creation_date_id_idx",
+        "creation_date",
+        "id",
+        postgresql_where=sa.text("NOT private"),
+    )
 
     @classmethod
-    def create_auto(cls, *args, **kwargs):
+    async def create_auto(cls, **kwargs) -> "Writeup":
+        """Create a writeup, raises `ContentConflict` if it clashes."""
         if "slug" not in kwargs:
             kwargs["slug"] = slug(kwargs["title"])
-        return cls.create(*args, **kwargs)
+        if "preview" not in kwargs:
+            kwargs["preview"] = render_preview(kwargs["content"])
+        return await _insert_unique(cls, kwargs)
 
-    def update_auto(self, *args, **kwargs):
+    async def update_auto(self, **kwargs):
+        """Update this writeup, raises `ContentConflict` if it clashes."""
         if "slug" not in kwargs:
             kwargs["slug"] = slug(kwargs["title"])
-        return self.update(*args, **kwargs)
+        if "content" in kwargs and "preview" not in kwargs:
+            kwargs["preview"] = render_preview(kwargs["content"])
+            kwargs["preview_complete"] = True
+        kwargs.setdefault("edit_date", func.now())
+        await _update_unique(self, kwargs)
 
 
 class Image(db.Model):
@@ -85,6 +228,12 @@ class Image(db.Model):
     filetype = db.Column(db.Text(), nullable=False)
     image = db.Column(db.LargeBinary(), nullable=False)
 
+    creation_date = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+
+    _library_idx = db.Index(
+        "images_author_id_creation_date_id_idx", "author_id", "creation_date", "id"
+    )
+
 
 class Challenge(db.Model):
     __tablename__ = "challenges"
@@ -96,6 +245,14 @@ class Challenge(db.Model):
     _slug_nonempty = (db.CheckConstraint('slug!=""'),)
 
     content = db.Column(db.Text(), nullable=False)
+    #: plaintext teaser of the content, see `render_preview`
+    preview = db.Column(db.Text(), nullable=False, server_default="")
+    #: false if `preview` is only the escaped fallback for content that went
+    #: over the render budget, `backfill_previews --incomplete` fills them in
+    preview_complete = db.Column(db.Boolean(), nullable=False, server_default=sa.true())
+    #: rendered html of the content, valid only while `rendered_key` matches
+    rendered_html = db.Column(db.Text(), nullable=True)
+    rendered_key = db.Column(db.Text(), nullable=True)
     tags = db.Column(ARRAY(db.Text()), nullable=False)
 
     flag = db.Column(db.Text(), unique=True, nullable=True)
@@ -110,6 +267,12 @@ class Challenge(db.Model):
     )
 
     creation_date = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    edit_date = db.Column(
+        db.DateTime,
+        server_default=func.now(),
+        server_onupdate=func.now(),
+        nullable=False,
+    )
 
     search_vector = db.Column(
         TSVectorType("title", "content", weights={"title": "A", "content": "B"})
@@ -119,17 +282,62 @@ class Challenge(db.Model):
     depreciated = db.Column(db.Boolean, nullable=False, default=False)
 
     _tags_idx = db.Index("challenge_tags_array_idx", "tags", postgresql_using="gin")
+    _title_trgm_idx = db.Index(
+        "challenges_title_trgm_idx",
+        "title",
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    _visible_listing_idx = db.Index(
+        "challenges_visible_creation_date_id_idx",
+        "creation_date",
+        "id",
+        postgresql_where=sa.text("NOT hidden"),
+    )
 
     @classmethod
-    def create_auto(cls, *args, **kwargs):
+    async def create_auto(cls, **kwargs) -> "Challenge":
+        """Create a challenge, raises `ContentConflict` if it clashes."""
         if "slug" not in kwargs:
             kwargs["slug"] = slug(kwargs["title"])
-        return cls.create(*args, **kwargs)
+        if "preview" not in kwargs:
+            kwargs["preview"] = render_preview(kwargs["content"])
+        return await _insert_unique(cls, kwargs)
 
-    def update_auto(self, *args, **kwargs):
+    async def update_auto(self, **kwargs):
+        """Update this challenge, raises `ContentConflict` if it clashes."""
         if "slug" not in kwargs:
             kwargs["slug"] = slug(kwargs["title"])
-        return self.update(*args, **kwargs)
+        if "content" in kwargs and "preview" not in kwargs:
+            kwargs["preview"] = render_preview(kwargs["content"])
+            kwargs["preview_complete"] = True
+        kwargs.setdefault("edit_date", func.now())
+        await _update_unique(self, kwargs)
+
+
+class Tag(db.Model):
+    """Every tag used by writeups or challenges, with how often it's used.
+
+    Maintained by triggers on the writeups and challenges tables.
+    """
+
+    __tablename__ = "tags"
+
+    #: either "writeup" or "challenge"
+    kind = db.Column(db.Text(), primary_key=True)
+    tag = db.Column(db.Text(), primary_key=True)
+
+    #: number of public writeups or visible challenges with this tag
+    public_count = db.Column(db.Integer(), nullable=False, server_default="0")
+    #: number of private writeups or hidden challenges with this tag
+    private_count = db.Column(db.Integer(), nullable=False, server_default="0")
+
+    _tag_trgm_idx = db.Index(
+        "tags_tag_trgm_idx",
+        "tag",
+        postgresql_using="gin",
+        postgresql_ops={"tag": "gin_trgm_ops"},
+    )
 
 
 class CompletedChallenge(db.Model):
@@ -151,6 +359,78 @@ class CompletedChallenge(db.Model):
         db.Integer(), nullable=False, default=1, server_default="1", primary_key=True
     )
 
+
+class Settings(db.Model):
+    """Settings shared by the bot and the site, there's only ever one row."""
+
+    __tablename__ = "settings"
+
+    id = db.Column(db.Boolean(), primary_key=True, server_default=sa.true())
+    _single_row = db.CheckConstraint("id")
+
+    #: the season that new solves count towards, see `luhack_bot.db.solves`
+    current_season = db.Column(db.Integer(), nullable=False)
+
+
+class RateLimit(db.Model):
+    """Rate limiting buckets shared by several processes.
+
+    See `luhack_bot.utils.rate_limit`.
+    """
+
+    __tablename__ = "rate_limits"
+
+    key = db.Column(db.Text(), primary_key=True)
+    #: when the bucket will have refilled completely
+    full_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+class ChallengeSolveCount(db.Model):
+    """How many users have solved each challenge in each season.
+
+    Maintained by triggers on the completedchallenges table.
+    """
+
+    __tablename__ = "challenge_solve_counts"
+
+    challenge_id = db.Column(
+        None,
+        db.ForeignKey("challenges.id", ondelete="CASCADE"),
+        nullable=False,
+        primary_key=True,
+    )
+    season = db.Column(db.Integer(), nullable=False, primary_key=True)
+
+    solves = db.Column(db.Integer(), nullable=False, server_default="0")
+
+
+class SeasonStanding(db.Model):
+    """Each user's score in each season, overall and per challenge tag.
+
+    Maintained by triggers on the completedchallenges and challenges tables,
+    see `luhack_bot.db.standings` for rebuilding it.
+    """
+
+    __tablename__ = "season_standings"
+
+    season = db.Column(db.Integer(), nullable=False, primary_key=True)
+    #: the challenge tag this is the score in, or "" for all challenges
+    tag = db.Column(db.Text(), nullable=False, primary_key=True)
+    discord_id = db.Column(
+        None,
+        db.ForeignKey("users.discord_id", ondelete="CASCADE"),
+        nullable=False,
+        primary_key=True,
+    )
+
+    score = db.Column(db.Integer(), nullable=False, server_default="0")
+    solves = db.Column(db.Integer(), nullable=False, server_default="0")
+
+    _score_idx = db.Index(
+        "season_standings_score_idx", "season", "tag", "score", "discord_id"
+    )
+
+
 class Machine(db.Model):
     """Target infrastructure machines"""
 
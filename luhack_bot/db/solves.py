@@ -0,0 +1,68 @@
+"""Checking answers to challenges and recording solves.
+
+Used by both the bot's /challenge claim and the site's submit form, so that
+they agree on what counts as a solve and which season it goes towards.
+"""
+
+import enum
+from typing import Optional
+
+import cachetools
+from sqlalchemy.dialects.postgresql import insert
+
+from luhack_bot.db.models import Challenge, CompletedChallenge, Settings, db
+from luhack_bot.utils.async_cache import async_cached
+
+
+class SolveResult(enum.Enum):
+    #: the answer was right and the solve has been recorded
+    solved = enum.auto()
+    incorrect = enum.auto()
+    #: the answer was right, but the challenge can't be scored anymore
+    depreciated = enum.auto()
+    already_solved = enum.auto()
+
+
+@async_cached(cache=cachetools.TTLCache(maxsize=1, ttl=60))
+async def current_season() -> int:
+    """The season that solves count towards, cached for a minute."""
+    return await db.select([Settings.current_season]).gino.scalar()
+
+
+async def set_current_season(season: int):
+    await Settings.update.values(current_season=season).gino.status()
+    current_season.clear()
+
+
+def check_answer(challenge: Challenge, answer: str) -> bool:
+    # one of flag and answer is always None
+    return bool(answer) and answer in (challenge.flag, challenge.answer)
+
+
+async def record_solve(
+    discord_id: int, challenge: Challenge, answer: str, season: Optional[int] = None
+) -> SolveResult:
+    """Check `answer` and record the solve of `challenge` if it's right.
+
+    :param season: the season to record the solve in, defaults to the
+                   current season
+    """
+    if not check_answer(challenge, answer):
+        return SolveResult.incorrect
+
+    if challenge.depreciated:
+        return SolveResult.depreciated
+
+    if season is None:
+        season = await current_season()
+
+    # the primary key catches repeat solves, even concurrent ones
+    solved = await (
+        insert(CompletedChallenge.__table__)
+        .values(discord_id=discord_id, challenge_id=challenge.id, season=season)
+        .on_conflict_do_nothing()
+        .returning(CompletedChallenge.challenge_id)
+        .gino.scalar()
+    )
+
+    return SolveResult.solved if solved is not None else SolveResult.already_solved
@@ -0,0 +1,78 @@
+"""Reading and repairing the season standings.
+
+The season_standings table is kept up to date by triggers as solves are added
+and removed, and as challenges have their points or tags changed, so reading
+a scoreboard never has to add up completedchallenges. Should it ever drift,
+`rebuild_standings` recomputes it from scratch.
+"""
+
+from typing import Optional
+
+import sqlalchemy as sa
+
+from luhack_bot.db.models import SeasonStanding, User, db
+
+#: the `tag` of the standings counting every challenge
+ALL_TAGS = ""
+
+_REBUILD = """
+INSERT INTO season_standings (season, tag, discord_id, score, solves)
+SELECT c.season, t.tag, c.discord_id, sum(ch.points), count(*)
+FROM completedchallenges c
+JOIN challenges ch ON ch.id = c.challenge_id
+CROSS JOIN LATERAL (
+    SELECT DISTINCT unnest(array_append(ch.tags, '')) AS tag
+) t
+{where}
+GROUP BY c.season, t.tag, c.discord_id
+"""
+
+
+async def rebuild_standings(season: Optional[int] = None) -> int:
+    """Recompute the standings of `season`, or of every season if None.
+
+    Returns the number of rows written.
+    """
+    async with db.transaction():
+        # hold off solves until we're done, so none are counted twice or missed
+        await db.status("LOCK TABLE season_standings IN EXCLUSIVE MODE")
+
+        delete = SeasonStanding.delete
+        if season is not None:
+            delete = delete.where(SeasonStanding.season == season)
+        await delete.gino.status()
+
+        if season is None:
+            rebuild = sa.text(_REBUILD.format(where=""))
+        else:
+            rebuild = sa.text(_REBUILD.format(where="WHERE c.season = :season"))
+            rebuild = rebuild.bindparams(season=season)
+
+        status, _ = await db.status(rebuild)
+
+    # asyncpg gives us the command tag, "INSERT 0 <rows>"
+    return int(status.split()[-1])
+
+
+def standings_of(season: int, tag: str = ALL_TAGS):
+    """Select the standings of `season` and usernames, highest score first."""
+    return (
+        db.select([SeasonStanding, User.username])
+        .select_from(SeasonStanding.join(User))
+        .where(SeasonStanding.season == season)
+        .where(SeasonStanding.tag == tag)
+        .order_by(SeasonStanding.score.desc(), SeasonStanding.discord_id.desc())
+    )
+
+
+async def rank_of(season: int, tag: str, score: int) -> int:
+    """The rank of `score`, users with the same score share a rank."""
+    above = await (
+        db.select([sa.func.count(sa.distinct(SeasonStanding.score))])
+        .where(SeasonStanding.season == season)
+        .where(SeasonStanding.tag == tag)
+        .where(SeasonStanding.score > score)
+        .gino.scalar()
+    )
+
+    return above + 1
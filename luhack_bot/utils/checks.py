@@ -87,9 +87,7 @@ def is_admin_int(interaction: discord.Interaction) -> bool:
 async def is_authed(ctx: commands.Context) -> bool:
     """Ensure a member is registered with LUHack."""
 
-    user = await User.get(ctx.author.id)
-
-    if user is None:
+    if not await User.is_verified(ctx.author.id):
         raise commands.CheckFailure(
             "It looks like you're not registed with luhack, go and register yourself."
         )
@@ -100,9 +98,7 @@ async def is_authed(ctx: commands.Context) -> bool:
 async def is_authed_int(ctx: discord.Interaction) -> bool:
     """Ensure a member is registered with LUHack."""
 
-    user = await User.get(ctx.user.id)
-
-    if user is None:
+    if not await User.is_verified(ctx.user.id):
         raise commands.CheckFailure(
             "It looks like you're not registed with luhack, go and register yourself."
         )
@@ -0,0 +1,123 @@
+"""Token bucket rate limiting, used to throttle flag submissions.
+
+Each bucket holds up to `burst` tokens and gets one back every `interval`
+seconds. A bucket is stored as just the time it'll be full again, taking a
+token pushes that back by `interval` and it can't go further than `burst`
+intervals ahead (this is the GCRA way of running a token bucket).
+"""
+
+import os
+import time
+from datetime import timedelta
+from typing import Optional
+
+import cachetools
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from luhack_bot.db.models import RateLimit, db
+
+#: how many flags can be submitted for a challenge in a row
+FLAG_BURST = int(os.getenv("FLAG_RATE_BURST") or 5)
+#: and after that, seconds between each submission
+FLAG_INTERVAL = float(os.getenv("FLAG_RATE_INTERVAL") or 30)
+#: keep flag rate limits in the database, so the bot and every site worker
+#: share them, otherwise each process has its own
+FLAG_SHARED = (os.getenv("FLAG_RATE_SHARED") or "1") == "1"
+
+
+class RateLimiter:
+    """Buckets kept in memory, these are evicted once they're full again."""
+
+    def __init__(self, burst: int, interval: float, maxsize: int = 4096):
+        self.burst = burst
+        self.interval = interval
+
+        # a bucket that's been left to fill up is the same as a new one
+        self.buckets = cachetools.TTLCache(maxsize=maxsize, ttl=burst * interval)
+
+    async def acquire(self, key: str) -> Optional[float]:
+        """Take a token from the bucket for `key`.
+
+        Returns None if there was one, otherwise how many seconds until there
+        will be.
+        """
+        now = time.monotonic()
+        full_at = max(self.buckets.get(key, now), now) + self.interval
+
+        wait = full_at - now - self.burst * self.interval
+        if wait > 0:
+            return wait
+
+        self.buckets[key] = full_at
+        return None
+
+
+class PostgresRateLimiter(RateLimiter):
+    """Buckets kept in the database, so that several processes share them."""
+
+    #: delete full buckets after this many acquires
+    prune_every = 1000
+
+    def __init__(self, burst: int, interval: float):
+        self.burst = burst
+        self.interval = interval
+
+        self.acquires = 0
+
+    async def acquire(self, key: str) -> Optional[float]:
+        self.acquires += 1
+        if self.acquires % self.prune_every == 0:
+            await self.prune()
+
+        now = sa.func.now()
+        interval = timedelta(seconds=self.interval)
+        # how far ahead full_at can be while there's still a token left
+        tolerance = timedelta(seconds=(self.burst - 1) * self.interval)
+
+        full_at = sa.func.greatest(RateLimit.full_at, now)
+
+        taken = await (
+            insert(RateLimit.__table__)
+            .values(key=key, full_at=now + interval)
+            .on_conflict_do_update(
+                index_elements=[RateLimit.key],
+                set_={"full_at": full_at + interval},
+                where=full_at - now <= tolerance,
+            )
+            .returning(RateLimit.full_at)
+            .gino.scalar()
+        )
+
+        if taken is not None:
+            return None
+
+        # only when limited, find out for how long
+        ahead = await (
+            db.select([sa.func.extract("epoch", RateLimit.full_at - now)])
+            .where(RateLimit.key == key)
+            .gino.scalar()
+        )
+
+        return max(float(ahead) - tolerance.total_seconds(), 0.0)
+
+    async def prune(self):
+        await RateLimit.delete.where(RateLimit.full_at < sa.func.now()).gino.status()
+
+
+def flag_key(discord_id: int, challenge_id: Optional[int] = None) -> str:
+    """The bucket for flags `discord_id` submits for a challenge.
+
+    Without `challenge_id`, the bucket every one of the user's claims through
+    the bot takes from.
+    """
+    if challenge_id is None:
+        return f"{discord_id}"
+
+    return f"{discord_id}:{challenge_id}"
+
+
+#: the limiter that the bot and site check flag submissions against
+flag_limiter = (PostgresRateLimiter if FLAG_SHARED else RateLimiter)(
+    burst=FLAG_BURST, interval=FLAG_INTERVAL
+)
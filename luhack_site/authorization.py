@@ -48,7 +48,7 @@ class TokenAuthBackend(AuthenticationBackend):
 
         user = request.session.get("user")
         if not user:
-            db_user = await DBUser.get(request.session["discord_id"])
+            db_user = await DBUser.get_public(request.session["discord_id"])
             log.info("First time adding user info for %s, user: %s", request.session["discord_id"], db_user)
 
             if db_user is None:
@@ -0,0 +1,257 @@
+"""Benchmarks the markdown renderers over a generated corpus of writeups.
+
+    python -m luhack_site.benchmark
+    python -m luhack_site.benchmark --save baseline.json
+    python -m luhack_site.benchmark --baseline baseline.json --threshold 0.1
+
+The corpus is generated from a fixed seed, so runs on the same machine are
+comparable. Each case is a renderer, a kind of document and a size, and
+reports throughput along with the median and 99th percentile time to render
+a single document. Given a baseline, the run fails if any case's throughput
+dropped by more than the threshold.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Sequence
+
+from luhack_site.markdown import (
+    highlight_markdown,
+    highlight_markdown_unsafe,
+    length_constrained_plaintext_markdown,
+)
+
+renderers: Dict[str, Callable[[str], str]] = {
+    "highlight": highlight_markdown,
+    "highlight_unsafe": highlight_markdown_unsafe,
+    "preview": length_constrained_plaintext_markdown,
+}
+
+#: roughly how many characters the documents of each size are
+SIZES = {"small": 2_000, "medium": 20_000, "large": 200_000}
+
+LANGUAGES = ["python", "bash", "c", "javascript", "php", "sql", "nosuchlang", ""]
+
+WORDS = (
+    "the flag was hidden in a base64 encoded cookie so we decoded it and sent "
+    "a crafted request to the admin panel which leaked the secret key then "
+    "used it to forge a session token overflow buffer stack canary libc "
+    "payload shell exploit binary reverse engineering ghidra strings"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 20))]
+
+    # some inline markup, as writeups have plenty
+    i = rng.randrange(len(words))
+    words[i] = rng.choice(
+        [
+            f"`{words[i]}`",
+            f"*{words[i]}*",
+            f"**{words[i]}**",
+            f"[{words[i]}](https://example.com/{words[i]})",
+            "https://luhack.uk",
+        ]
+    )
+
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _code_block(rng: random.Random) -> str:
+    lines = [
+        f"{rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.randint(0, 1 << 16)})"
+        for _ in range(rng.randint(3, 30))
+    ]
+    return f"```{rng.choice(LANGUAGES)}\n" + "\n".join(lines) + "\n```"
+
+
+def _media(rng: random.Random) -> str:
+    kind = rng.choice(["audio", "video"])
+    return f"!{kind}[{rng.choice(WORDS)}](/images/{rng.randint(0, 999)}.mp4)"
+
+
+def _table(rng: random.Random) -> str:
+    rows = [" | ".join(rng.choice(WORDS) for _ in range(3)) for _ in range(5)]
+    return "\n".join(["a | b | c", "--- | --- | ---", *rows])
+
+
+def _list(rng: random.Random) -> str:
+    return "\n".join(f"- {_sentence(rng)}" for _ in range(rng.randint(2, 8)))
+
+
+#: the blocks each kind of document is made from, and how often
+KINDS = {
+    "prose": [(_paragraph, 6), (_list, 2), (_table, 1), (_code_block, 1)],
+    "media": [(_paragraph, 3), (_media, 3)],
+    "code": [(_paragraph, 1), (_code_block, 4)],
+}
+
+
+def generate(kind: str, size: int, rng: random.Random) -> str:
+    blocks, weights = zip(*KINDS[kind])
+
+    parts = [f"# {_sentence(rng)}"]
+    length = len(parts[0])
+
+    while length < size:
+        if rng.random() < 0.1:
+            part = f"## {_sentence(rng)}"
+        else:
+            part = rng.choices(blocks, weights)[0](rng)
+
+        parts.append(part)
+        length += len(part) + 2
+
+    return "\n\n".join(parts)
+
+
+@dataclass
+class Result:
+    docs: int
+    docs_per_s: float
+    mb_per_s: float
+    p50_ms: float
+    p99_ms: float
+
+
+def _percentile(times: List[float], p: float) -> float:
+    times = sorted(times)
+    return times[max(math.ceil(p * len(times)) - 1, 0)]
+
+
+def run_case(render: Callable[[str], str], docs: List[str], repeat: int) -> Result:
+    # warm up any caches, so that only the steady state is measured
+    for doc in docs:
+        render(doc)
+
+    times = []
+    for _ in range(repeat):
+        for doc in docs:
+            start = time.perf_counter()
+            render(doc)
+            times.append(time.perf_counter() - start)
+
+    total = sum(times)
+    size = sum(len(doc.encode()) for doc in docs) * repeat
+
+    return Result(
+        docs=len(times),
+        docs_per_s=len(times) / total,
+        mb_per_s=size / total / 1e6,
+        p50_ms=_percentile(times, 0.5) * 1000,
+        p99_ms=_percentile(times, 0.99) * 1000,
+    )
+
+
+def run(
+    docs_per_case: int, repeat: int, seed: int, only: Sequence[str] = ()
+) -> Dict[str, Result]:
+    """Run every case, or those with any of `only` in their name."""
+    results = {}
+
+    for kind in KINDS:
+        for size_name, size in SIZES.items():
+            rng = random.Random(f"{seed}:{kind}:{size_name}")
+            # fewer of the larger documents, so each case takes similar time
+            count = max(docs_per_case * SIZES["small"] // size, 2)
+            docs = [generate(kind, size, rng) for _ in range(count)]
+
+            for name, render in renderers.items():
+                case = f"{name}/{kind}/{size_name}"
+                if only and not any(o in case for o in only):
+                    continue
+
+                results[case] = run_case(render, docs, repeat)
+
+    return results
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    """The cases whose throughput dropped by more than `threshold` of the baseline."""
+    regressed = []
+
+    for case, result in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+
+        if result.docs_per_s < base["docs_per_s"] * (1 - threshold):
+            regressed.append(case)
+
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m luhack_site.benchmark", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument(
+        "--docs", type=int, default=50, help="small documents per case (default 50)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="renders of each document (default 3)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--case", action="append", default=[], help="only run cases containing this"
+    )
+    parser.add_argument("--save", metavar="FILE", help="save the results as json")
+    parser.add_argument("--baseline", metavar="FILE", help="compare to saved results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fail if throughput drops by more than this fraction (default 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.docs, args.repeat, args.seed, args.case)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(
+        f"{'case':<32} {'docs':>6} {'docs/s':>10} {'MB/s':>8} "
+        f"{'p50 ms':>9} {'p99 ms':>9} {'change':>8}"
+    )
+    for case, r in results.items():
+        change = ""
+        if case in baseline:
+            change = f"{r.docs_per_s / baseline[case]['docs_per_s'] - 1:+.1%}"
+
+        print(
+            f"{case:<32} {r.docs:>6} {r.docs_per_s:>10.1f} {r.mb_per_s:>8.2f} "
+            f"{r.p50_ms:>9.2f} {r.p99_ms:>9.2f} {change:>8}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({case: asdict(r) for case, r in results.items()}, f, indent=2)
+
+    if args.baseline:
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} cases slower than the baseline allows:")
+            for case in regressed:
+                print(f"  {case}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
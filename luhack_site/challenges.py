@@ -1,111 +1,183 @@
-import orjson
+from typing import Set
+
+import cachetools
 import sqlalchemy as sa
 from gino.loader import ColumnLoader
-from luhack_bot.db.models import Challenge, CompletedChallenge, db
+from luhack_bot.db.helpers import tag_counts
+from luhack_bot.db.models import (
+    Challenge,
+    ChallengeSolveCount,
+    ContentConflict,
+    SeasonStanding,
+    Tag,
+    User,
+    db,
+)
+from luhack_bot.db.solves import SolveResult, current_season, record_solve
+from luhack_bot.db.standings import ALL_TAGS, rank_of, standings_of
+from luhack_bot.utils.async_cache import async_cached
+from luhack_bot.utils.rate_limit import flag_key, flag_limiter
 from slug import slug
 from starlette.authentication import requires
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import HTTPConnection
 from starlette.routing import Router
 
+from luhack_site import settings
 from luhack_site.authorization import can_edit
+from luhack_site.conditional import make_etag, not_modified, set_validators
 from luhack_site.content_logger import log_create, log_delete, log_edit
-from luhack_site.forms import AnswerForm, ChallengeForm
-from luhack_site.images import encoded_existing_images
-from luhack_site.markdown import (
-    highlight_markdown_unsafe,
-    length_constrained_plaintext_markdown,
-)
+from luhack_site.feeds import FEED_SIZE, FeedEntry, feed_response
+from luhack_site.forms import AnswerForm, ChallengeForm, add_conflict_errors
+from luhack_site.images import editor_bootstrap
+from luhack_site.invalidation import content_changed, on_content_change
+from luhack_site.live_preview import preview_response
+from luhack_site.pagination import OffsetPage, page_number
+from luhack_site.render_cache import render_stored, rendered_columns
+from luhack_site.solved import SolvedCache
+from luhack_site.suggest import normalise_query, ranked_matches, suggestions_response
 from luhack_site.templater import templates
-from luhack_site.utils import abort, redirect_response
+from luhack_site.utils import abort, redirect_response, too_many_requests
 
 router = Router()
 
 
-def should_skip_challenge(c: Challenge, is_admin: bool) -> bool:
-    return c.hidden and not is_admin
+def challenge_visibility(is_admin: bool):
+    return True if is_admin else sa.not_(Challenge.hidden)
 
 
-CURRENT_SEASON = 4
+solved_cache = SolvedCache(maxsize=settings.SOLVED_CACHE_SIZE)
 
+#: the columns that challenge previews display
+listing_columns = (
+    Challenge.id,
+    Challenge.title,
+    Challenge.slug,
+    Challenge.tags,
+    Challenge.preview,
+    Challenge.points,
+    Challenge.creation_date,
+    Challenge.edit_date,
+    Challenge.hidden,
+    Challenge.depreciated,
+)
 
-@router.route("/")
-async def challenge_index(request: HTTPConnection):
-    solves = sa.func.count(CompletedChallenge.challenge_id).label("solves")
 
-    select = [Challenge, solves]
-    columns = (Challenge, ColumnLoader(solves))
+#: the number of solves of a challenge in a season, select from `with_solve_count`
+solve_count = sa.func.coalesce(ChallengeSolveCount.solves, 0).label("solves")
 
-    if request.user.is_authenticated:
-        solved_challenges = (
-            db.select([CompletedChallenge.challenge_id])
-            .where(CompletedChallenge.discord_id == request.user.discord_id)
-            .where(CompletedChallenge.season == CURRENT_SEASON)
-            .cte("solved_challenges")
-        )
+#: rows on each page of the scoreboard
+SCOREBOARD_PAGE_SIZE = 50
 
-        solved = (
-            sa.exists()
-            .where(solved_challenges.c.challenge_id == Challenge.id)
-            .label("solved")
-        )
+#: form errors for each way a submitted answer can fail
+solve_errors = {
+    SolveResult.incorrect: "Incorrect answer.",
+    SolveResult.depreciated: "Correct, but this challenge is depreciated, sorry.",
+    SolveResult.already_solved: "You've already solved this challenge.",
+}
 
-        select.append(solved)
-        columns = (*columns, ColumnLoader(solved))
 
-    challenges = await (
-        db.select(select)
-        .select_from(
-            Challenge.outerjoin(
-                CompletedChallenge,
-                (Challenge.id == CompletedChallenge.challenge_id)
-                & (CompletedChallenge.season == CURRENT_SEASON),
-            )
-        )
-        .group_by(Challenge.id)
-        .order_by(Challenge.creation_date.desc(), Challenge.id.desc())
-        .gino.load(columns)
-        .all()
+def with_solve_count(season: int, challenges=Challenge):
+    """Join the solve count of each challenge in `season` onto `challenges`."""
+    return challenges.outerjoin(
+        ChallengeSolveCount,
+        (ChallengeSolveCount.challenge_id == Challenge.id)
+        & (ChallengeSolveCount.season == season),
+    )
+
+
+def challenge_version(c: Challenge):
+    """What changes whenever a listing showing `c` should be re-rendered."""
+    return (
+        c.id,
+        c.edit_date,
+        c.title,
+        c.tags,
+        c.preview,
+        c.points,
+        c.hidden,
+        c.depreciated,
     )
 
+
+async def solved_challenges(request: HTTPConnection, season: int) -> Set[int]:
+    """The ids of the challenges the user has solved in `season`."""
+    if not request.user.is_authenticated:
+        return set()
+
+    return await solved_cache.get(request.user.discord_id, season)
+
+
+def listing_response(request: HTTPConnection, challenges, solved: Set[int]):
     rendered = [
         (
             w,
-            length_constrained_plaintext_markdown(w.content),
+            w.preview,
             solves,
-            did_solve and did_solve[0],
+            w.id in solved,
         )
-        for (w, solves, *did_solve) in challenges
-        if not should_skip_challenge(w, request.user.is_admin)
+        for (w, solves) in challenges
     ]
 
-    return templates.TemplateResponse(
-        "challenge/index.j2",
-        {
-            "request": request,
-            "challenges": rendered,
-        },
+    etag = make_etag(
+        request,
+        [
+            (challenge_version(w), solves, did_solve)
+            for (w, _, solves, did_solve) in rendered
+        ],
+    )
+    dates = [d for (w, *_) in rendered for d in (w.creation_date, w.edit_date)]
+
+    # solve counts change without moving the dates
+    response = not_modified(request, etag, *dates, check_dates=False)
+    if response is not None:
+        return response
+
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "challenge/index.j2",
+            {
+                "request": request,
+                "challenges": rendered,
+            },
+        ),
+        etag,
+        *dates,
+    )
+
+
+@router.route("/")
+async def challenge_index(request: HTTPConnection):
+    season = await current_season()
+
+    columns = (Challenge.load(*listing_columns), ColumnLoader(solve_count))
+
+    challenges = await (
+        db.select([*listing_columns, solve_count])
+        .select_from(with_solve_count(season))
+        .where(challenge_visibility(request.user.is_admin))
+        .order_by(Challenge.creation_date.desc(), Challenge.id.desc())
+        .gino.load(columns)
+        .all()
+    )
+
+    return listing_response(
+        request, challenges, await solved_challenges(request, season)
     )
 
 
 @router.route("/view/{slug}")
 async def challenge_view(request: HTTPConnection):
     slug = request.path_params["slug"]
-
-    solves = sa.func.count(CompletedChallenge.challenge_id).label("solves")
+    season = await current_season()
 
     challenge = await (
-        db.select([Challenge, solves])
-        .select_from(
-            Challenge.outerjoin(
-                CompletedChallenge,
-                (Challenge.id == CompletedChallenge.challenge_id)
-                & (CompletedChallenge.season == CURRENT_SEASON),
-            )
-        )
-        .group_by(Challenge.id)
+        db.select([Challenge, solve_count])
+        .select_from(with_solve_count(season))
         .where(Challenge.slug == slug)
-        .gino.load((Challenge, ColumnLoader(solves)))
+        .where(challenge_visibility(request.user.is_admin))
+        .gino.load((Challenge, ColumnLoader(solve_count)))
         .first()
     )
 
@@ -114,119 +186,258 @@ async def challenge_view(request: HTTPConnection):
 
     challenge, solves = challenge
 
-    if should_skip_challenge(challenge, request.user.is_admin):
-        return abort(404, "Challenge not found")
+    solved_challenge = challenge.id in await solved_challenges(request, season)
 
-    if request.user.is_authenticated:
-        solved_challenge = await CompletedChallenge.query.where(
-            (CompletedChallenge.discord_id == request.user.discord_id)
-            & (CompletedChallenge.challenge_id == challenge.id)
-            & (CompletedChallenge.season == CURRENT_SEASON)
-        ).gino.first()
-    else:
-        solved_challenge = False
+    etag = make_etag(
+        request,
+        challenge_version(challenge),
+        challenge.content,
+        solves,
+        bool(solved_challenge),
+    )
+    dates = (challenge.creation_date, challenge.edit_date)
 
-    rendered = highlight_markdown_unsafe(challenge.content)
+    # solve counts change without moving the dates
+    response = not_modified(request, etag, *dates, check_dates=False)
+    if response is not None:
+        return response
 
-    return templates.TemplateResponse(
-        "challenge/view.j2",
-        {
-            "challenge": challenge,
-            "request": request,
-            "rendered": rendered,
-            "solves": solves,
-            "submit_form": AnswerForm(),
-            "solved_challenge": solved_challenge,
-        },
+    rendered = await render_stored("highlight_unsafe", challenge)
+
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "challenge/view.j2",
+            {
+                "challenge": challenge,
+                "request": request,
+                "rendered": rendered,
+                "solves": solves,
+                "submit_form": AnswerForm(),
+                "solved_challenge": solved_challenge,
+            },
+        ),
+        etag,
+        *dates,
     )
 
 
 @router.route("/tag/{tag}")
 async def challenge_by_tag(request: HTTPConnection):
     tag = request.path_params["tag"]
+    season = await current_season()
 
-    solves = sa.func.count(CompletedChallenge.challenge_id).label("solves")
-
-    select = [Challenge, solves]
-    columns = (Challenge, ColumnLoader(solves))
-
-    if request.user.is_authenticated:
-        solved_challenges = (
-            db.select([CompletedChallenge.challenge_id])
-            .where(CompletedChallenge.season == CURRENT_SEASON)
-            .where(CompletedChallenge.discord_id == request.user.discord_id)
-            .cte("solved_challenges")
-        )
-
-        solved = (
-            sa.exists()
-            .where(solved_challenges.c.challenge_id == Challenge.id)
-            .label("solved")
-        )
-
-        select.append(solved)
-        columns = (*columns, ColumnLoader(solved))
+    columns = (Challenge.load(*listing_columns), ColumnLoader(solve_count))
 
     challenges = await (
-        db.select(select)
-        .select_from(
-            Challenge.outerjoin(
-                CompletedChallenge,
-                (Challenge.id == CompletedChallenge.challenge_id)
-                & (CompletedChallenge.season == CURRENT_SEASON),
-            )
-        )
-        .group_by(Challenge.id)
+        db.select([*listing_columns, solve_count])
+        .select_from(with_solve_count(season))
         .where(Challenge.tags.contains([tag]))
+        .where(challenge_visibility(request.user.is_admin))
         .order_by(Challenge.creation_date.desc(), Challenge.id.desc())
         .gino.load(columns)
         .all()
     )
 
-    rendered = [
-        (
-            w,
-            length_constrained_plaintext_markdown(w.content),
-            solves,
-            did_solve and did_solve[0],
-        )
-        for (w, solves, *did_solve) in challenges
-        if not should_skip_challenge(w, request.user.is_admin)
-    ]
+    if not challenges:
+        return abort(404, "Tag not found")
+
+    return listing_response(
+        request, challenges, await solved_challenges(request, season)
+    )
+
+
+@router.route("/tags")
+async def challenge_all_tags(request: HTTPConnection):
+    tags = (
+        await tag_counts("challenge", request.user.is_admin)
+        .order_by(sa.column("count"))
+        .gino.all()
+    )
 
     return templates.TemplateResponse(
-        "challenge/index.j2",
-        {
-            "request": request,
-            "challenges": rendered,
-        },
+        "challenge/tag_list.j2",
+        {"request": request, "tags": tags},
+    )
+
+
+def season_param(request: HTTPConnection, default: int) -> int:
+    """Read the `season` query param, treating garbage as `default`."""
+    try:
+        return int(request.query_params["season"])
+    except (KeyError, ValueError):
+        return default
+
+
+@router.route("/scoreboard")
+async def challenge_scoreboard(request: HTTPConnection):
+    current = await current_season()
+    season = season_param(request, current)
+    tag = request.query_params.get("tag", ALL_TAGS)
+
+    page_size = SCOREBOARD_PAGE_SIZE
+    number = page_number(request)
+
+    rows = await (
+        standings_of(season, tag)
+        .limit(page_size + 1)
+        .offset((number - 1) * page_size)
+        .gino.load((SeasonStanding, ColumnLoader(User.username)))
+        .all()
     )
 
+    page = OffsetPage(rows[:page_size], number=number, has_next=len(rows) > page_size)
+
+    # only the first row's rank needs looking up, the rest follow on from it
+    standings = []
+    if page.items:
+        rank = await rank_of(season, tag, page.items[0][0].score)
+        previous = page.items[0][0].score
+
+        for standing, username in page.items:
+            if standing.score < previous:
+                rank, previous = rank + 1, standing.score
+            standings.append((rank, standing, username))
+
+    mine = None
+    if request.user.is_authenticated:
+        standing = await SeasonStanding.get((season, tag, request.user.discord_id))
+        if standing is not None:
+            mine = (await rank_of(season, tag, standing.score), standing)
 
-async def get_all_tags(include_hidden: bool = False):
     tags = (
-        await sa.select([sa.column("tag")])
-        .select_from(Challenge)
-        .select_from(sa.func.unnest(Challenge.tags).alias("tag"))
-        .where(True if include_hidden else sa.not_(Challenge.hidden))
-        .group_by(sa.column("tag"))
-        .order_by(sa.func.count())
+        await tag_counts("challenge", request.user.is_admin)
+        .order_by(Tag.tag)
         .gino.all()
     )
 
-    return [i for (i,) in tags]
+    etag = make_etag(
+        request,
+        season,
+        tag,
+        number,
+        page.has_next,
+        [
+            (rank, s.discord_id, username, s.score, s.solves)
+            for (rank, s, username) in standings
+        ],
+        mine and (mine[0], mine[1].score, mine[1].solves),
+        tags,
+    )
 
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
 
-@router.route("/tags")
-async def challenge_all_tags(request: HTTPConnection):
-    tags = await get_all_tags()
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "challenge/scoreboard.j2",
+            {
+                "request": request,
+                "season": season,
+                "seasons": range(current, 0, -1),
+                "tag": tag,
+                "tags": [t for (t, _) in tags],
+                "standings": standings,
+                "mine": mine,
+                "page": page,
+            },
+        ),
+        etag,
+    )
 
-    return templates.TemplateResponse(
-        "challenge/tag_list.j2",
-        {"request": request, "tags": tags},
+
+@async_cached(cache=cachetools.TTLCache(maxsize=1024, ttl=60))
+async def suggest_challenges(q: str, include_hidden: bool):
+    titles = await ranked_matches(
+        db.select([Challenge.title, Challenge.slug]).where(
+            challenge_visibility(include_hidden)
+        ),
+        Challenge.title,
+        q,
+    ).gino.all()
+
+    tags = await ranked_matches(
+        tag_counts("challenge", include_hidden), Tag.tag, q
+    ).gino.all()
+
+    return [(title, slug) for (title, slug) in titles], [tag for (tag, _) in tags]
+
+
+on_content_change(suggest_challenges.clear)
+
+
+@router.route("/suggest")
+async def challenge_suggest(request: HTTPConnection):
+    q = normalise_query(request.query_params.get("q", ""))
+
+    titles, tags = await suggest_challenges(q, request.user.is_admin) if q else ([], [])
+
+    return suggestions_response(
+        request, titles, tags, "challenge_view", "challenge_by_tag"
     )
 
 
+async def challenge_feed_entries(request: HTTPConnection, tag: str = None):
+    query = Challenge.load(*listing_columns).where(sa.not_(Challenge.hidden))
+
+    if tag is not None:
+        query = query.where(Challenge.tags.contains([tag]))
+
+    challenges = (
+        await query.order_by(Challenge.creation_date.desc(), Challenge.id.desc())
+        .limit(FEED_SIZE)
+        .gino.all()
+    )
+
+    return [
+        FeedEntry(
+            title=c.title,
+            url=str(request.url_for("challenge_view", slug=c.slug)),
+            published=c.creation_date,
+            updated=max(c.creation_date, c.edit_date),
+            summary=c.preview,
+            tags=c.tags,
+        )
+        for c in challenges
+    ]
+
+
+@router.route("/feed.atom")
+async def challenge_feed(request: HTTPConnection):
+    return feed_response(
+        request,
+        "LUHack Challenges",
+        str(request.url_for("challenge_index")),
+        await challenge_feed_entries(request),
+    )
+
+
+@router.route("/tag/{tag}/feed.atom")
+async def challenge_tag_feed(request: HTTPConnection):
+    tag = request.path_params["tag"]
+
+    return feed_response(
+        request,
+        f"LUHack Challenges tagged {tag}",
+        str(request.url_for("challenge_by_tag", tag=tag)),
+        await challenge_feed_entries(request, tag),
+    )
+
+
+@router.route("/editor.json")
+@requires("admin", redirect="not_admin")
+async def challenge_editor(request: HTTPConnection):
+    return await editor_bootstrap(request, "challenge")
+
+
+@router.route("/preview", methods=["POST"])
+@requires("admin", redirect="not_admin")
+async def challenge_preview(request: HTTPConnection):
+    return await preview_response(request, "highlight_unsafe")
+
+
 @router.route("/delete/{id:int}")
 @requires("admin", redirect="not_admin")
 async def challenge_delete(request: HTTPConnection):
@@ -241,6 +452,7 @@ async def challenge_delete(request: HTTPConnection):
         return abort(400)
 
     await challenge.delete()
+    content_changed()
     await log_delete("challenge", challenge.title, request.user.username)
 
     return redirect_response(url=request.url_for("challenge_index"))
@@ -251,6 +463,13 @@ async def challenge_delete(request: HTTPConnection):
 async def challenge_submit_answer(request: HTTPConnection):
     id = request.path_params["id"]
 
+    # before anything else, so that guesses are cheap to turn away
+    retry_after = await flag_limiter.acquire(flag_key(request.user.discord_id, id))
+    if retry_after is not None:
+        return too_many_requests(retry_after)
+
+    season = await current_season()
+
     form = await request.form()
     form = AnswerForm(form)
 
@@ -258,20 +477,12 @@ async def challenge_submit_answer(request: HTTPConnection):
 
     answer = form.answer.data
 
-    solves = sa.func.count(CompletedChallenge.challenge_id).label("solves")
-
     challenge = await (
-        db.select([Challenge, solves])
-        .select_from(
-            Challenge.outerjoin(
-                CompletedChallenge,
-                (Challenge.id == CompletedChallenge.challenge_id)
-                & (CompletedChallenge.season == CURRENT_SEASON),
-            )
-        )
-        .group_by(Challenge.id)
+        db.select([Challenge, solve_count])
+        .select_from(with_solve_count(season))
         .where(Challenge.id == id)
-        .gino.load((Challenge, ColumnLoader(solves)))
+        .where(challenge_visibility(request.user.is_admin))
+        .gino.load((Challenge, ColumnLoader(solve_count)))
         .first()
     )
 
@@ -280,41 +491,21 @@ async def challenge_submit_answer(request: HTTPConnection):
 
     challenge, solves = challenge
 
-    if should_skip_challenge(challenge, request.user.is_admin):
-        return abort(404, "Challenge not found")
-
-    if (challenge.answer or challenge.flag) != answer:
-        is_valid = False
-        form.answer.errors.append("Incorrect answer.")
-
-    # TODO? change this to a flash message
-    if challenge.depreciated:
-        is_valid = False
-        form.answer.errors.append("Correct, but this challenge is depreciated, sorry.")
-
-    already_claimed = await CompletedChallenge.query.where(
-        (CompletedChallenge.discord_id == request.user.discord_id)
-        & (CompletedChallenge.challenge_id == challenge.id)
-        & (CompletedChallenge.season == CURRENT_SEASON)
-    ).gino.first()
+    if is_valid:
+        result = await record_solve(request.user.discord_id, challenge, answer, season)
 
-    if already_claimed is not None:
-        # shouldn't see the form anyway
-        is_valid = False
-        form.answer.errors.append("You've already solved this challenge.")
+        if result is SolveResult.solved:
+            # don't wait for the notification, we're about to show it as solved
+            solved_cache.add(request.user.discord_id, season, challenge.id)
 
-    if is_valid:
-        await CompletedChallenge.create(
-            discord_id=request.user.discord_id,
-            challenge_id=challenge.id,
-            season=CURRENT_SEASON,
-        )
+            return redirect_response(
+                url=request.url_for("challenge_view", slug=challenge.slug)
+            )
 
-        return redirect_response(
-            url=request.url_for("challenge_view", slug=challenge.slug)
-        )
+        # TODO? change the depreciated one to a flash message
+        form.answer.errors.append(solve_errors[result])
 
-    rendered = highlight_markdown_unsafe(challenge.content)
+    rendered = await render_stored("highlight_unsafe", challenge)
 
     return templates.TemplateResponse(
         "challenge/view.j2",
@@ -334,16 +525,11 @@ class NewChallenge(HTTPEndpoint):
     async def get(self, request: HTTPConnection):
         form = ChallengeForm()
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(include_hidden=True))
-
         return templates.TemplateResponse(
             "challenge/new.j2",
             {
                 "request": request,
                 "form": form,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -361,54 +547,41 @@ class NewChallenge(HTTPEndpoint):
                 "A valid url-safe name cannot be generated for this title."
             )
 
-        if (
-            await Challenge.query.where(
-                sa.or_(
-                    Challenge.title == form.title.data,
-                    Challenge.slug == slug(form.title.data),
-                )
-            ).gino.first()
-            is not None
-        ):
-            is_valid = False
-            form.title.errors.append(
-                f"A challenge with the title conflicting with '{form.title.data}' already exists."
-            )
-
         if is_valid:
             f_a = form.flag_or_answer.data
             flag, answer = (f_a, None) if form.is_flag.data else (None, f_a)
 
-            challenge = await Challenge.create_auto(
-                title=form.title.data,
-                content=form.content.data,
-                flag=flag,
-                answer=answer,
-                hidden=form.hidden.data,
-                depreciated=form.depreciated.data,
-                points=form.points.data,
-                tags=form.tags.data,
-            )
-
-            url = request.url_for("challenge_view", slug=challenge.slug)
-
-            if not challenge.hidden:
-                await log_create(
-                    "challenge", challenge.title, request.user.username, url
+            try:
+                challenge = await Challenge.create_auto(
+                    title=form.title.data,
+                    content=form.content.data,
+                    flag=flag,
+                    answer=answer,
+                    hidden=form.hidden.data,
+                    depreciated=form.depreciated.data,
+                    points=form.points.data,
+                    tags=form.tags.data,
+                    **await rendered_columns("highlight_unsafe", form.content.data),
                 )
+            except ContentConflict as e:
+                add_conflict_errors(form, e.columns, "challenge")
+            else:
+                content_changed()
 
-            return redirect_response(url=url)
+                url = request.url_for("challenge_view", slug=challenge.slug)
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(include_hidden=True))
+                if not challenge.hidden:
+                    await log_create(
+                        "challenge", challenge.title, request.user.username, url
+                    )
+
+                return redirect_response(url=url)
 
         return templates.TemplateResponse(
             "challenge/new.j2",
             {
                 "request": request,
                 "form": form,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -438,17 +611,12 @@ class EditChallenge(HTTPEndpoint):
             tags=challenge.tags,
         )
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(include_hidden=True))
-
         return templates.TemplateResponse(
             "challenge/edit.j2",
             {
                 "request": request,
                 "form": form,
                 "challenge": challenge,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -476,42 +644,30 @@ class EditChallenge(HTTPEndpoint):
                 "A valid url-safe name cannot be generated for this title."
             )
 
-        if challenge.title != form.title.data:
-            if (
-                await Challenge.query.where(
-                    sa.or_(
-                        Challenge.title == form.title.data,
-                        Challenge.slug == slug(form.title.data),
-                    )
-                ).gino.first()
-                is not None
-            ):
-                is_valid = False
-                form.title.errors.append(
-                    f"A challenge with the title conflicting with '{form.title.data}' already exists."
-                )
-
         if is_valid:
             f_a = form.flag_or_answer.data
             flag, answer = (f_a, None) if form.is_flag.data else (None, f_a)
 
-            await challenge.update_auto(
-                title=form.title.data,
-                content=form.content.data,
-                flag=flag,
-                answer=answer,
-                hidden=form.hidden.data,
-                depreciated=form.depreciated.data,
-                points=form.points.data,
-                tags=form.tags.data,
-            ).apply()
-
-            url = request.url_for("challenge_view", slug=challenge.slug)
+            try:
+                await challenge.update_auto(
+                    title=form.title.data,
+                    content=form.content.data,
+                    flag=flag,
+                    answer=answer,
+                    hidden=form.hidden.data,
+                    depreciated=form.depreciated.data,
+                    points=form.points.data,
+                    tags=form.tags.data,
+                    **await rendered_columns("highlight_unsafe", form.content.data),
+                )
+            except ContentConflict as e:
+                add_conflict_errors(form, e.columns, "challenge")
+            else:
+                content_changed()
 
-            return redirect_response(url=url)
+                url = request.url_for("challenge_view", slug=challenge.slug)
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(include_hidden=True))
+                return redirect_response(url=url)
 
         return templates.TemplateResponse(
             "challenge/edit.j2",
@@ -519,7 +675,5 @@ class EditChallenge(HTTPEndpoint):
                 "request": request,
                 "form": form,
                 "challenge": challenge,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
@@ -0,0 +1,113 @@
+"""Conditional GET support for content pages.
+
+Handlers compute an ETag (and optionally a Last-Modified date) from what
+they've loaded, call `not_modified` before rendering anything, and then
+`set_validators` on the response they do render.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+
+# pages are rendered from templates too, so anything served by a previous
+# deploy shouldn't be reused
+_started = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def make_etag(request: HTTPConnection, *parts) -> str:
+    """Build a strong ETag from the auth state of `request` and `parts`.
+
+    `parts` should cover everything the page renders that can change.
+    """
+    user = request.user
+    auth = (getattr(user, "discord_id", None), user.is_admin)
+
+    h = hashlib.sha256(repr((_started, auth, parts)).encode())
+    return f'"{h.hexdigest()[:32]}"'
+
+
+def _last_modified(*dates: Optional[datetime]) -> datetime:
+    # the db stores naive utc datetimes
+    dates = [d.replace(tzinfo=timezone.utc, microsecond=0) for d in dates if d]
+    return max([_started, *dates])
+
+
+def _headers(request: HTTPConnection, etag: str, last_modified: Optional[datetime]):
+    cache_control = "private, no-cache" if request.user.is_authed else "no-cache"
+
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Cookie"}
+
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    return headers
+
+
+def _is_fresh(
+    request: HTTPConnection,
+    etag: str,
+    last_modified: Optional[datetime],
+    check_dates: bool,
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+
+    # If-Modified-Since is ignored when If-None-Match is given
+    if if_none_match is not None:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since is None or last_modified is None or not check_dates:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    return last_modified <= since
+
+
+def not_modified(
+    request: HTTPConnection,
+    etag: str,
+    *dates: Optional[datetime],
+    check_dates: bool = True,
+) -> Optional[Response]:
+    """Return a 304 response if the client's copy is still fresh.
+
+    `dates` are the modification dates of the content on the page, the
+    newest is used as the Last-Modified date. Pass none to only use the ETag.
+
+    Pass `check_dates=False` if the page shows things that change without
+    moving `dates` (e.g. solve counts). Last-Modified is still sent, but only
+    the ETag can then get a 304.
+    """
+    last_modified = _last_modified(*dates) if dates else None
+
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    if not _is_fresh(request, etag, last_modified, check_dates):
+        return None
+
+    return Response(status_code=304, headers=_headers(request, etag, last_modified))
+
+
+def set_validators(
+    request: HTTPConnection, response: Response, etag: str, *dates: Optional[datetime]
+) -> Response:
+    """Add the ETag, Last-Modified and caching headers to `response`."""
+    last_modified = _last_modified(*dates) if dates else None
+
+    response.headers.update(_headers(request, etag, last_modified))
+
+    return response
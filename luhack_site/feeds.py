@@ -0,0 +1,61 @@
+"""Atom feeds of the newest writeups and challenges.
+
+Feeds are built from the stored previews, and answer conditional requests
+before rendering so feed readers can poll cheaply.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from starlette.requests import HTTPConnection
+
+from luhack_site.conditional import make_etag, not_modified, set_validators
+from luhack_site.templater import templates
+
+#: how many entries a feed contains
+FEED_SIZE = 20
+
+
+@dataclass
+class FeedEntry:
+    title: str
+    url: str
+    published: datetime
+    updated: datetime
+    summary: str
+    tags: List[str] = field(default_factory=list)
+    author: Optional[str] = None
+
+
+def feed_response(
+    request: HTTPConnection, title: str, alternate_url: str, entries: List[FeedEntry]
+):
+    etag = make_etag(
+        request,
+        title,
+        [(e.url, e.updated, e.title, e.summary, e.tags, e.author) for e in entries],
+    )
+    dates = [e.updated for e in entries]
+
+    # deleting or hiding an entry shifts an older one in without moving the dates
+    response = not_modified(request, etag, *dates, check_dates=False)
+    if response is not None:
+        return response
+
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "atom.j2",
+            {
+                "request": request,
+                "title": title,
+                "alternate_url": alternate_url,
+                "updated": max(dates, default=datetime.utcnow()),
+                "entries": entries,
+            },
+            media_type="application/atom+xml",
+        ),
+        etag,
+        *dates,
+    )
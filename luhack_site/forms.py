@@ -54,6 +54,9 @@ class WriteupForm(Form):
     private = BooleanField("Private")
     content = TextAreaField("Content")
 
+    #: which field to report a clash on each unique column against
+    conflict_fields = {"title": "title", "slug": "title"}
+
 
 class ChallengeForm(Form):
     title = StringField("Title", [validators.Length(min=4, max=25)])
@@ -65,6 +68,38 @@ class ChallengeForm(Form):
     depreciated = BooleanField("Depreciated")
     points = IntegerField("Points", [validators.NumberRange(min=1)])
 
+    conflict_fields = {"title": "title", "slug": "title", "flag": "flag_or_answer"}
+
 
 class AnswerForm(Form):
     answer = StringField("Enter your flag/answer")
+
+
+_conflict_messages = {
+    "title": "A {noun} with the title '{title}' already exists.",
+    "slug": "A {noun} with the title conflicting with '{title}' already exists.",
+    "flag": "A {noun} with this flag already exists.",
+}
+
+
+def add_conflict_errors(form: Form, columns, noun: str):
+    """Report the unique columns that a save clashed on as errors on `form`.
+
+    :param columns: the columns of a `ContentConflict`
+    :param noun: what's being saved, "writeup" or "challenge"
+    """
+    # the clashing row may have been deleted since, blame the title anyway
+    columns = columns or {"slug"}
+
+    reported = set()
+
+    for column, message in _conflict_messages.items():
+        field = form.conflict_fields.get(column)
+
+        if column not in columns or field is None or field in reported:
+            continue
+
+        reported.add(field)
+        getattr(form, field).errors.append(
+            message.format(noun=noun, title=form.title.data)
+        )
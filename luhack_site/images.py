@@ -1,18 +1,25 @@
+import asyncio
 import imghdr
-from typing import List, Tuple
+from uuid import UUID
 
+import cachetools
 import orjson
 import sqlalchemy as sa
+from cachetools import keys
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import HTTPConnection
 from starlette.responses import Response, JSONResponse
 from starlette.authentication import requires
 from starlette.routing import Router
 
+from luhack_bot.db.helpers import tag_counts
 from luhack_bot.db.models import Image
+from luhack_bot.utils.async_cache import async_cached
 
 from luhack_site.utils import abort
 from luhack_site.authorization import can_edit
+from luhack_site.invalidation import on_content_change
+from luhack_site.pagination import keyset_paginate
 from luhack_site import converters
 
 # magick happens here
@@ -20,6 +27,18 @@ converters.inject()
 
 router = Router()
 
+#: how many images the editor's image library loads at a time
+IMAGES_PAGE_SIZE = 24
+
+
+def _per_user_key(request: HTTPConnection, *args):
+    return keys.hashkey(request.user.discord_id, str(request.url), *args)
+
+
+# editor data is per user, and only kept briefly as tags change underneath it
+_editor_cache = cachetools.TTLCache(maxsize=256, ttl=30)
+on_content_change(_editor_cache.clear)
+
 
 class ORJSONResponse(JSONResponse):
     def render(self, content) -> bytes:
@@ -55,6 +74,7 @@ class Images(HTTPEndpoint):
             return abort(400)
 
         await image.delete()
+        _editor_cache.clear()
 
         return Response()
 
@@ -73,25 +93,61 @@ async def image_upload(request: HTTPConnection):
     file = await Image.create(
         author_id=request.user.discord_id, filetype=filetype, image=file_contents
     )
+    _editor_cache.clear()
 
     return ORJSONResponse({"filename": f"{file.id}.{filetype}"})
 
 
-async def get_existing_images(author_id: int) -> List[Tuple[str, str]]:
-    return (
-        await sa.select([Image.id, Image.filetype])
-        .where(Image.author_id == author_id)
-        .gino.all()
+async def _image_page(request: HTTPConnection) -> dict:
+    page = await keyset_paginate(
+        request,
+        Image.load(Image.id, Image.filetype, Image.creation_date).where(
+            Image.author_id == request.user.discord_id
+        ),
+        Image.creation_date,
+        Image.id,
+        page_size=IMAGES_PAGE_SIZE,
+        id_type=UUID,
     )
 
+    return {
+        "images": [
+            {
+                "filename": f"{image.id}.{image.filetype}",
+                "path": str(
+                    request.url_for("images", file_name=(image.id, image.filetype))
+                ),
+            }
+            for image in page.items
+        ],
+        "next": page.next_url(request.url_for("image_library")),
+    }
 
-async def encoded_existing_images(request: HTTPConnection) -> bytes:
-    images = await get_existing_images(request.user.discord_id)
-    images = [
-        {
-            "filename": f"{id}.{ext}",
-            "path": str(request.url_for("images", file_name=(id, ext))),
-        }
-        for (id, ext) in images
-    ]
-    return orjson.dumps(images)
+
+@async_cached(cache=_editor_cache, key=_per_user_key)
+async def _image_library(request: HTTPConnection) -> dict:
+    return await _image_page(request)
+
+
+@router.route("/", name="image_library")
+@requires("authenticated")
+async def image_library(request: HTTPConnection):
+    """A page of the user's uploaded images, newest first."""
+    return ORJSONResponse(await _image_library(request))
+
+
+@async_cached(cache=_editor_cache, key=_per_user_key)
+async def _editor_bootstrap(request: HTTPConnection, kind: str) -> dict:
+    tags = tag_counts(kind, include_private=True).order_by(sa.column("count"))
+
+    tags, images = await asyncio.gather(tags.gino.all(), _image_page(request))
+
+    return {"tags": [tag for (tag, _) in tags], **images}
+
+
+async def editor_bootstrap(request: HTTPConnection, kind: str):
+    """Respond with what the editor of a writeup or challenge needs.
+
+    That's all the `kind` tags, and the first page of the user's images.
+    """
+    return ORJSONResponse(await _editor_bootstrap(request, kind))
@@ -0,0 +1,17 @@
+"""Hooks for throwing away caches when writeups or challenges change."""
+
+from typing import Callable, List
+
+_listeners: List[Callable[[], None]] = []
+
+
+def on_content_change(f: Callable[[], None]) -> Callable[[], None]:
+    """Register `f` to be called whenever a writeup or challenge changes."""
+    _listeners.append(f)
+    return f
+
+
+def content_changed():
+    """Call after creating, editing or deleting a writeup or challenge."""
+    for f in _listeners:
+        f()
@@ -0,0 +1,207 @@
+"""Live previews of the markdown in the writeup and challenge editors.
+
+The editor posts the whole document as it changes, along with the keys of the
+blocks it already has. The document is split into its top level blocks, and
+only the blocks that aren't in the author's block cache are rendered. Blocks
+the editor already has are sent back without their html.
+
+Blocks are split where each run of blank lines between top level elements
+starts, as found by the block parser (and plugins) of the renderer in use.
+Each block after the first starts with the blank lines before it, so it's
+parsed in the same context as in the whole document, and link reference
+definitions from the whole document are given to each block. Rendering them
+one at a time gives the same html as rendering the whole document, which
+`verify_live_previews` checks against the stored documents.
+"""
+
+import copy
+import hashlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import cachetools
+import mistune
+from starlette.requests import HTTPConnection
+
+from luhack_site.images import ORJSONResponse
+from luhack_site.markdown import RENDERER_VERSION
+from luhack_site.render_cache import html_size
+from luhack_site.render_service import fallback, render_service, renderers
+from luhack_site.utils import abort
+
+#: bytes of rendered blocks to keep for each author
+BLOCK_CACHE_SIZE = 4 * 1024 * 1024
+#: bytes of rendered blocks to keep for every author together, the authors
+#: that previewed least recently are dropped to stay within it
+TOTAL_BLOCK_CACHE_SIZE = 32 * 1024 * 1024
+#: the most block keys an editor can say it has
+MAX_HAVE = 4096
+
+
+class _BlockCaches:
+    """The block cache of each author, bounded in total."""
+
+    def __init__(self, size: int, total_size: int):
+        self.size = size
+        self.total_size = total_size
+
+        self.caches: "OrderedDict[int, cachetools.LRUCache]" = OrderedDict()
+
+    def get(self, discord_id: int) -> cachetools.LRUCache:
+        cache = self.caches.get(discord_id)
+        if cache is None:
+            cache = cachetools.LRUCache(maxsize=self.size, getsizeof=html_size)
+            self.caches[discord_id] = cache
+
+        self.caches.move_to_end(discord_id)
+        return cache
+
+    def trim(self):
+        """Drop the caches of the authors that previewed least recently until
+        they all fit, never the most recent one."""
+        total = sum(c.currsize for c in self.caches.values())
+
+        while total > self.total_size and len(self.caches) > 1:
+            _, cache = self.caches.popitem(last=False)
+            total -= cache.currsize
+
+
+_block_caches = _BlockCaches(BLOCK_CACHE_SIZE, TOTAL_BLOCK_CACHE_SIZE)
+
+
+def _block_starts(renderer: str, state: mistune.BlockState) -> List[int]:
+    """Parse `state` with the renderer's block parser, returns where each run
+    of blank lines the top level of the parser matched starts.
+
+    Blank lines matched while parsing another element (e.g. ending a block
+    quote's lazy continuation) aren't counted, as the element can still move
+    its tokens after them.
+    """
+    block = copy.copy(renderers[renderer].block)
+    parse_method = block.parse_method
+    starts = []
+    depth = 0
+
+    def top_level_parse_method(m, state):
+        nonlocal depth
+
+        if depth == 0 and state.parent is None and m.lastgroup == "blank_line":
+            starts.append(m.start())
+
+        depth += 1
+        try:
+            return parse_method(m, state)
+        finally:
+            depth -= 1
+
+    block.parse_method = top_level_parse_method
+    block.parse(state)
+
+    return starts
+
+
+def split_blocks(renderer: str, content: str) -> Tuple[List[str], dict]:
+    """Split `content` into top level blocks, also returns its link references.
+
+    The blocks joined together are `content` as the renderer sees it.
+    """
+    # as mistune does before parsing
+    content = content.replace("\r\n", "\n").replace("\r", "\n")
+    if not content.endswith("\n"):
+        content += "\n"
+
+    state = renderers[renderer].block.state_cls()
+    state.process(content)
+
+    starts = [0, *_block_starts(renderer, state), len(content)]
+    blocks = [content[start:end] for (start, end) in zip(starts, starts[1:])]
+
+    return [b for b in blocks if b], state.env["ref_links"]
+
+
+def block_key(renderer: str, refs: dict, block: str) -> str:
+    h = hashlib.sha256(f"{renderer}:{RENDERER_VERSION}:".encode())
+    h.update(repr(sorted(refs.items())).encode())
+    h.update(block.encode())
+    return h.hexdigest()
+
+
+def render_blocks(
+    renderer: str, content: str, known: FrozenSet[str]
+) -> List[Tuple[str, Optional[str]]]:
+    """The key of each block of `content` and its html, None if it's in `known`.
+
+    Run in the render workers.
+    """
+    md = renderers[renderer]
+    blocks, refs = split_blocks(renderer, content)
+
+    rendered: Dict[str, Optional[str]] = {}
+    keys = []
+
+    for block in blocks:
+        key = block_key(renderer, refs, block)
+        keys.append(key)
+
+        if key in known or key in rendered:
+            continue
+
+        state = md.block.state_cls()
+        state.env["ref_links"] = dict(refs)
+        rendered[key], _ = md.parse(block, state)
+
+    return [(key, rendered.get(key)) for key in keys]
+
+
+def _fallback_blocks(renderer: str, content: str):
+    key = hashlib.sha256(f"fallback:{renderer}:{content}".encode()).hexdigest()
+    return ORJSONResponse({"blocks": [[key, fallback(renderer, content)]]})
+
+
+async def preview_response(request: HTTPConnection, renderer: str):
+    """Respond with the blocks of the posted document.
+
+    Each block is a `[key, html]` pair, where html is null if the editor said
+    it already has that key.
+    """
+    try:
+        data = await request.json()
+        content = data["content"]
+        have = frozenset(data.get("have", ())[:MAX_HAVE])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return abort(400, "Expected {content, have}")
+
+    if not isinstance(content, str) or not all(isinstance(k, str) for k in have):
+        return abort(400, "Expected {content, have}")
+
+    if len(content) > render_service.max_size:
+        render_service.too_large += 1
+        return _fallback_blocks(renderer, content)
+
+    cache = _block_caches.get(request.user.discord_id)
+
+    # copied, as other previews can change the cache while we wait
+    cached = dict(cache.items())
+
+    rendered = await render_service.run(
+        render_blocks, renderer, content, have.union(cached)
+    )
+    if rendered is None:
+        return _fallback_blocks(renderer, content)
+
+    blocks = []
+    for key, html in rendered:
+        if html is not None:
+            try:
+                cache[key] = html
+            except ValueError:
+                # larger than the whole cache
+                pass
+        elif key not in have:
+            html = cached[key]
+
+        blocks.append([key, html])
+
+    _block_caches.trim()
+
+    return ORJSONResponse({"blocks": blocks})
@@ -1,13 +1,19 @@
 import textwrap
-from functools import wraps
+from functools import lru_cache, wraps
+from typing import Optional
 
 import mistune
 from pygments import highlight
+from pygments.lexer import Lexer
 from pygments.lexers import get_lexer_by_name
 from pygments.util import ClassNotFound
 from pygments.formatters import html
 
 
+#: bump this whenever a change alters the html the renderers produce, so that
+#: cached renders are thrown away
+RENDERER_VERSION = 1
+
 AUDIO_PATTERN = (
     r'!audio\['
     r'(?P<audio_title>[\S]*?)\]\((?P<audio_link>[\S]+?)\)'
@@ -28,7 +34,6 @@ VIDEO_PATTERN = (
 
 def parse_video(inline, m, state):
     title, link = m.group('video_title', 'video_link')
-    print(title, link)
     state.append_token({'type': 'video', 'raw': link, 'attrs': {'title': title}})
     return m.end() + 1
 
@@ -43,6 +48,18 @@ def plugin_media(md):
         md.renderer.register('audio', render_html_audio)
         md.renderer.register('video', render_html_video)
 
+#: lexers and formatters keep no state between uses, so they're shared by every
+#: code block instead of being looked up and built for each one
+_formatter = html.HtmlFormatter()
+
+@lru_cache(maxsize=256)
+def _lexer(alias: str) -> Optional[Lexer]:
+    """The lexer for a code block's language, or None if there isn't one."""
+    try:
+        return get_lexer_by_name(alias, stripall=True)
+    except ClassNotFound:
+        return None
+
 class HighlightRenderer(mistune.HTMLRenderer):
     def block_code(self, code, info=None):
         def no_highlight():
@@ -52,13 +69,12 @@ class HighlightRenderer(mistune.HTMLRenderer):
         if not info:
             return no_highlight()
 
-        try:
-            lexer = get_lexer_by_name(info, stripall=True)
-            formatter = html.HtmlFormatter()
-            return highlight(code, lexer, formatter)
-        except ClassNotFound:
+        lexer = _lexer(info.lower())
+        if lexer is None:
             return no_highlight()
 
+        return highlight(code, lexer, _formatter)
+
     def image(self, alt, url, title=None):
         url = self.safe_url(url)
         html = f'<img class="pure-img" src="{url}" alt="{alt}" '
@@ -99,14 +115,16 @@ plaintext_renderer = PlaintextRenderer(escape=True)
 
 highlight_markdown = mistune.create_markdown(renderer=highlight_renderer, plugins=['url', 'table', plugin_media])
 highlight_markdown_unsafe = mistune.create_markdown(renderer=highlight_renderer_unsafe, plugins=['url', 'table', plugin_media])
-length_constrained_plaintext_markdown = mistune.create_markdown(renderer=plaintext_renderer, plugins=['url'])
 
 tokens_in_previews = {
     "text", "link", "emphasis", "strong", "codespan", "linebreak", "softbreak", "paragraph", "strikethrough"
 }
 
+#: how many characters of paragraph text previews are cut down to
+PREVIEW_LENGTH = 500
+
 def len_limit_hook(md, state):
-    limit = 500
+    limit = PREVIEW_LENGTH
     current = 0
     out = []
 
@@ -129,5 +147,68 @@ def len_limit_hook(md, state):
 
     state.tokens = out
 
-length_constrained_plaintext_markdown.before_render_hooks.append(len_limit_hook)
-length_constrained_plaintext_markdown.after_render_hooks.append(lambda s, result, st: result.replace("\n", " "))
+class PreviewBlockParser(mistune.BlockParser):
+    """Stops parsing a document once it has the paragraphs `len_limit_hook` keeps.
+
+    A link reference definition later on would change how the links in those
+    paragraphs are parsed, so if there could be one the rest of the document
+    is parsed as usual.
+    """
+
+    def parse(self, state, rules=None):
+        # block quotes and lists parse their contents with this too
+        if state.parent is not None:
+            return super().parse(state, rules)
+
+        sc = self.compile_sc(rules)
+
+        # paragraphs before the last token are complete, the last one could
+        # still be extended or turned into a heading
+        counted = 0
+        length = 0
+
+        # where the last thing that could be a link reference definition is
+        last_ref = state.src.rfind("]:")
+
+        while state.cursor < state.cursor_max:
+            for tok in state.tokens[counted:-1]:
+                if tok["type"] in tokens_in_previews and "text" in tok:
+                    length += len(tok["text"])
+            counted = max(len(state.tokens) - 1, counted)
+
+            if length >= PREVIEW_LENGTH and state.cursor > last_ref:
+                return
+
+            m = sc.search(state.src, state.cursor)
+            if not m:
+                break
+
+            end_pos = m.start()
+            if end_pos > state.cursor:
+                text = state.get_text(end_pos)
+                state.add_paragraph(text)
+                state.cursor = end_pos
+
+            end_pos = self.parse_method(m, state)
+            if end_pos:
+                state.cursor = end_pos
+            else:
+                end_pos = state.find_line_end()
+                text = state.get_text(end_pos)
+                state.add_paragraph(text)
+                state.cursor = end_pos
+
+        if state.cursor < state.cursor_max:
+            text = state.src[state.cursor:]
+            state.add_paragraph(text)
+            state.cursor = state.cursor_max
+
+def _preview_markdown(block=None):
+    md = mistune.Markdown(renderer=plaintext_renderer, block=block, plugins=[mistune.import_plugin('url')])
+    md.before_render_hooks.append(len_limit_hook)
+    md.after_render_hooks.append(lambda s, result, st: result.replace("\n", " "))
+    return md
+
+length_constrained_plaintext_markdown = _preview_markdown(PreviewBlockParser())
+#: parses the whole of every document, `verify_previews` checks the above against it
+full_length_constrained_plaintext_markdown = _preview_markdown()
@@ -0,0 +1,192 @@
+"""A short lived cache of whole pages, for visitors that aren't logged in.
+
+Anonymous visitors all see the same html, so their GETs are served from a
+small TTL cache in front of the app. Concurrent misses for the same url are
+coalesced so only one of them renders the page, and the cache is cleared
+whenever a writeup or challenge changes.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cachetools
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from luhack_site.invalidation import on_content_change
+
+# stripped when filling the cache, so that we always store a full response
+_CONDITIONAL_HEADERS = {b"if-none-match", b"if-modified-since"}
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+    @property
+    def etag(self) -> Optional[str]:
+        return Headers(raw=self.headers).get("etag")
+
+    @property
+    def cacheable(self) -> bool:
+        headers = Headers(raw=self.headers)
+        cache_control = headers.get("cache-control", "")
+
+        return (
+            self.status == 200
+            and "set-cookie" not in headers
+            and "private" not in cache_control
+            and "no-store" not in cache_control
+        )
+
+
+class PageCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        #: bumped on every clear, so renders started before it aren't stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.uncacheable = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "uncacheable": self.uncacheable,
+            "size": len(self.entries),
+        }
+
+
+class PageCacheMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: PageCache,
+        prefixes: Sequence[str] = ("/writeups", "/challenges"),
+        session_cookie: str = "session",
+    ):
+        self.app = app
+        self.cache = cache
+        self.prefixes = tuple(prefixes)
+        self.session_cookie = session_cookie
+
+        on_content_change(cache.clear)
+
+    def should_cache(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+
+        if not scope["path"].startswith(self.prefixes):
+            return False
+
+        # anyone with a session might be logged in
+        cookies = Headers(scope=scope).get("cookie", "")
+        return f"{self.session_cookie}=" not in cookies
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.should_cache(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+
+        entry = self.cache.entries.get(key)
+        if entry is not None:
+            self.cache.hits += 1
+            await self.replay(entry, scope, send, "HIT")
+            return
+
+        in_flight = self.cache.in_flight.get(key)
+        if in_flight is not None:
+            self.cache.coalesced += 1
+            entry = await asyncio.shield(in_flight)
+
+            if entry is not None:
+                await self.replay(entry, scope, send, "HIT")
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        self.cache.misses += 1
+
+        generation = self.cache.generation
+        in_flight = asyncio.get_running_loop().create_future()
+        self.cache.in_flight[key] = in_flight
+
+        try:
+            entry = await self.render(scope, receive)
+        except BaseException:
+            in_flight.set_result(None)
+            raise
+        finally:
+            self.cache.in_flight.pop(key, None)
+
+        if entry.cacheable:
+            if generation == self.cache.generation:
+                self.cache.entries[key] = entry
+            in_flight.set_result(entry)
+        else:
+            self.cache.uncacheable += 1
+            in_flight.set_result(None)
+
+        await self.replay(entry, scope, send, "MISS")
+
+    async def render(self, scope: Scope, receive: Receive) -> CachedResponse:
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for (k, v) in scope["headers"] if k not in _CONDITIONAL_HEADERS
+        ]
+
+        messages: List[Message] = []
+
+        async def capture(message: Message):
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+
+        start = next(m for m in messages if m["type"] == "http.response.start")
+        body = b"".join(
+            m.get("body", b"") for m in messages if m["type"] == "http.response.body"
+        )
+
+        return CachedResponse(start["status"], list(start.get("headers", [])), body)
+
+    async def replay(
+        self, entry: CachedResponse, scope: Scope, send: Send, cache_status: str
+    ):
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        etag = entry.etag
+
+        if if_none_match is not None and etag is not None:
+            tags = {t.strip() for t in if_none_match.split(",")}
+            not_modified = "*" in tags or etag in tags or f"W/{etag}" in tags
+        else:
+            not_modified = False
+
+        if not_modified:
+            status, body = 304, b""
+            headers = [
+                (k, v)
+                for (k, v) in entry.headers
+                if k not in (b"content-length", b"content-type")
+            ]
+        else:
+            status, body, headers = entry.status, entry.body, list(entry.headers)
+
+        message = {"type": "http.response.start", "status": status, "headers": headers}
+        MutableHeaders(scope=message)["x-cache"] = cache_status
+
+        await send(message)
+        await send({"type": "http.response.body", "body": body})
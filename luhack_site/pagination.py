@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+
+import sqlalchemy as sa
+from starlette.datastructures import URL
+from starlette.requests import HTTPConnection
+
+from luhack_site import settings
+
+T = TypeVar("T")
+
+Keyset = Tuple[datetime, Any]
+
+
+def encode_cursor(keyset: Keyset) -> str:
+    date, id = keyset
+    return f"{date.isoformat()}_{id}"
+
+
+def decode_cursor(cursor: str, id_type: Callable[[str], Any] = int) -> Optional[Keyset]:
+    """Decode a cursor produced by `encode_cursor`, returns None if it's garbage."""
+    date, _, id = cursor.rpartition("_")
+
+    try:
+        return datetime.fromisoformat(date), id_type(id)
+    except ValueError:
+        return None
+
+
+def _default_key(row) -> Keyset:
+    return row.creation_date, row.id
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    prev_cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+    def prev_url(self, url: URL) -> Optional[str]:
+        if self.prev_cursor is None:
+            return None
+        return str(
+            url.remove_query_params("after").include_query_params(
+                before=self.prev_cursor
+            )
+        )
+
+    def next_url(self, url: URL) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return str(
+            url.remove_query_params("before").include_query_params(
+                after=self.next_cursor
+            )
+        )
+
+
+@dataclass
+class OffsetPage(Generic[T]):
+    """A numbered page, for results that aren't ordered by a keyset (search ranks)."""
+
+    items: List[T]
+    number: int = 1
+    has_next: bool = False
+    #: number of results in total, at most `count_cap`
+    count: Optional[int] = None
+    count_cap: Optional[int] = None
+
+    @property
+    def count_capped(self) -> bool:
+        return self.count is not None and self.count == self.count_cap
+
+    def prev_url(self, url: URL) -> Optional[str]:
+        if self.number <= 1:
+            return None
+        return str(url.include_query_params(page=self.number - 1))
+
+    def next_url(self, url: URL) -> Optional[str]:
+        if not self.has_next:
+            return None
+        return str(url.include_query_params(page=self.number + 1))
+
+
+def page_number(request: HTTPConnection) -> int:
+    """Read the 1-based `page` query param, treating garbage as the first page."""
+    try:
+        return max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+async def keyset_paginate(
+    request: HTTPConnection,
+    query,
+    date_col,
+    id_col,
+    *,
+    page_size: Optional[int] = None,
+    loader=None,
+    key: Callable[[Any], Keyset] = _default_key,
+    id_type: Callable[[str], Any] = int,
+) -> Page:
+    """Fetch a single page of `query`, newest first, keyed on `(date_col, id_col)`.
+
+    The cursors are read from the `after` and `before` query params, an
+    invalid cursor is treated as if it wasn't given. `id_type` parses the id
+    half of a cursor.
+    """
+    page_size = page_size or settings.WRITEUPS_PAGE_SIZE
+
+    after = request.query_params.get("after")
+    after = after and decode_cursor(after, id_type)
+    before = request.query_params.get("before")
+    before = before and decode_cursor(before, id_type)
+
+    keyset = sa.tuple_(date_col, id_col)
+
+    if before:
+        query = query.where(keyset > sa.tuple_(*before)).order_by(
+            date_col.asc(), id_col.asc()
+        )
+    else:
+        if after:
+            query = query.where(keyset < sa.tuple_(*after))
+        query = query.order_by(date_col.desc(), id_col.desc())
+
+    query = query.limit(page_size + 1)
+
+    if loader is not None:
+        rows = await query.gino.load(loader).all()
+    else:
+        rows = await query.gino.all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if not rows:
+        return Page(rows)
+
+    if before:
+        rows.reverse()
+        prev_cursor = encode_cursor(key(rows[0])) if has_more else None
+        next_cursor = encode_cursor(key(rows[-1]))
+    else:
+        prev_cursor = encode_cursor(key(rows[0])) if after else None
+        next_cursor = encode_cursor(key(rows[-1])) if has_more else None
+
+    return Page(rows, prev_cursor, next_cursor)
@@ -0,0 +1,126 @@
+"""Caching of rendered markdown.
+
+Renders are keyed on a hash of the renderer, the renderer version and the
+content, so edits and renderer changes never see a stale render.
+
+There are two tiers: a byte bounded LRU in this process, and the
+`rendered_html`/`rendered_key` columns of writeups and challenges, which are
+filled in when content is saved (and when a stale row is viewed).
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Set, Tuple, Union
+
+import cachetools
+from luhack_bot.db.models import Challenge, Writeup
+
+from luhack_site import settings
+from luhack_site.markdown import RENDERER_VERSION
+from luhack_site.render_service import render_service
+
+log = logging.getLogger(__name__)
+
+
+def html_size(html: str) -> int:
+    """The size of `html` in bytes, for bounding caches of it."""
+    return len(html.encode())
+
+
+_cache = cachetools.LRUCache(maxsize=settings.RENDER_CACHE_SIZE, getsizeof=html_size)
+
+# the write backs of `render_stored` still running, held on to so they aren't
+# garbage collected part way through
+_storing: Set[asyncio.Task] = set()
+
+
+def render_key(renderer: str, content: str) -> str:
+    h = hashlib.sha256(f"{renderer}:{RENDERER_VERSION}:".encode())
+    h.update(content.encode())
+    return h.hexdigest()
+
+
+async def render(renderer: str, content: str, key: str = None) -> Tuple[str, bool]:
+    """Render `content` with the named renderer, going through the in-memory cache.
+
+    Returns the html and if it's a full render, only those are cached, see
+    `RenderService.render`.
+    """
+    key = key or render_key(renderer, content)
+
+    try:
+        return _cache[key], True
+    except KeyError:
+        pass
+
+    rendered, complete = await render_service.render(renderer, content)
+
+    if complete:
+        try:
+            _cache[key] = rendered
+        except ValueError:
+            # larger than the whole cache
+            pass
+
+    return rendered, complete
+
+
+async def rendered_columns(renderer: str, content: str) -> dict:
+    """The values to store in the preview and rendered columns when saving `content`.
+
+    Pass these along to `create_auto`/`update_auto`.
+    """
+    # over budget, this stores the escaped fallback and marks it to be filled
+    # in by `backfill_previews --incomplete`, rather than rendering it here
+    preview, complete = await render_service.render("preview", content)
+    columns = {
+        "preview": preview,
+        "preview_complete": complete,
+        "rendered_html": None,
+        "rendered_key": None,
+    }
+
+    if not settings.RENDER_CACHE_PERSIST:
+        return columns
+
+    key = render_key(renderer, content)
+    rendered, complete = await render(renderer, content, key)
+
+    if complete:
+        columns.update(rendered_html=rendered, rendered_key=key)
+
+    return columns
+
+
+async def _store_render(model, id: int, rendered: str, key: str):
+    try:
+        await (
+            model.update.values(rendered_html=rendered, rendered_key=key)
+            .where(model.id == id)
+            .gino.status()
+        )
+    except Exception:
+        # it'll be stored next time the row is viewed
+        log.exception(f"Couldn't store the render of {model.__tablename__} {id}")
+
+
+async def render_stored(renderer: str, row: Union[Writeup, Challenge]) -> str:
+    """Render the content of a writeup or challenge.
+
+    Uses the stored render if it's still valid, and stores a fresh one if not,
+    in the background so the request doesn't wait on the write.
+    """
+    key = render_key(renderer, row.content)
+
+    if row.rendered_key == key and row.rendered_html is not None:
+        return row.rendered_html
+
+    rendered, complete = await render(renderer, row.content, key)
+
+    if complete and settings.RENDER_CACHE_PERSIST:
+        task = asyncio.create_task(_store_render(type(row), row.id, rendered, key))
+        _storing.add(task)
+        task.add_done_callback(_storing.discard)
+
+    return rendered
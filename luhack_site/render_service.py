@@ -0,0 +1,206 @@
+"""Renders markdown in a pool of worker processes.
+
+Rendering is CPU bound, done in a handler it holds up every other request on
+the uvicorn worker for as long as it takes. So documents are rendered in a
+process pool instead, with a budget on their size and on the time spent
+rendering them. A document over either budget is shown as escaped plaintext.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+import mistune
+
+from luhack_site import settings
+from luhack_site.markdown import (
+    highlight_markdown,
+    highlight_markdown_unsafe,
+    length_constrained_plaintext_markdown,
+)
+
+log = logging.getLogger(__name__)
+
+renderers = {
+    "highlight": highlight_markdown,
+    "highlight_unsafe": highlight_markdown_unsafe,
+    "preview": length_constrained_plaintext_markdown,
+}
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout()
+
+
+def _init_worker():
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _within_budget(timeout: float, fn, *args):
+    """Call `fn` in a worker, returns None if it took longer than `timeout`."""
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return fn(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except RenderTimeout:
+        return None
+
+
+def _render(renderer: str, content: str) -> str:
+    return renderers[renderer](content)
+
+
+def fallback(renderer: str, content: str) -> str:
+    """What to show instead of a render that went over budget."""
+    if renderer == "preview":
+        return mistune.escape(textwrap.shorten(content, 500, placeholder=" ..."))
+
+    return f"<pre>{mistune.escape(content)}</pre>"
+
+
+class RenderService:
+    def __init__(self, workers: int, max_size: int, timeout: float):
+        self.workers = workers
+        self.max_size = max_size
+        self.timeout = timeout
+
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+        #: renders sent to the pool that haven't come back yet
+        self.queued = 0
+
+        self.renders = 0
+        self.too_large = 0
+        self.timed_out = 0
+        #: renders lost to a worker dying
+        self.broken = 0
+        #: times the pool was replaced, because a worker died or got stuck
+        self.restarts = 0
+
+    def start(self):
+        if self.workers <= 0:
+            return
+
+        # not forked, the site process has an event loop and db connections
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+        )
+
+    def close(self):
+        if self.pool is None:
+            return
+
+        pool, self.pool = self.pool, None
+
+        # shutting down doesn't stop workers that are still rendering, and
+        # one stuck where the alarm can't interrupt it would never finish
+        workers = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for worker in workers:
+            worker.terminate()
+
+    def restart(self, pool: ProcessPoolExecutor):
+        """Replace `pool` with a new one, unless that's already been done."""
+        if self.pool is not pool:
+            return
+
+        self.restarts += 1
+        self.close()
+        self.start()
+
+    async def run(self, fn, *args):
+        """Call `fn(*args)` in the pool, within the time budget.
+
+        Returns None if it went over. `fn` is pickled by name, so it has to be
+        a module level function.
+        """
+        self.renders += 1
+
+        # without a pool, run in process and without a time budget
+        if self.pool is None:
+            return fn(*args)
+
+        pool = self.pool
+
+        self.queued += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                pool, _within_budget, self.timeout, fn, *args
+            )
+            # the worker stops itself at the time budget, this leaves as long
+            # again to wait in the queue and covers renders stuck in C code
+            result = await asyncio.wait_for(future, self.timeout * 2)
+        except asyncio.TimeoutError:
+            # the worker could be stuck for good, and would hold on to its
+            # place in the pool, so start afresh (failing the other renders
+            # in flight on this pool)
+            if self.pool is pool:
+                log.warning(
+                    "A render went over its hard time budget, restarting the pool"
+                )
+            self.restart(pool)
+            self.timed_out += 1
+            return None
+        except BrokenProcessPool:
+            # other renders on the same pool will have seen it break too
+            if self.pool is pool:
+                log.exception("A render worker died, restarting the pool")
+            self.restart(pool)
+            self.broken += 1
+            return None
+        finally:
+            self.queued -= 1
+
+        if result is None:
+            self.timed_out += 1
+
+        return result
+
+    async def render(self, renderer: str, content: str) -> Tuple[str, bool]:
+        """Render `content` with the named renderer.
+
+        Returns the html and if it's a full render, rather than the fallback
+        for a document over budget (which shouldn't be cached).
+        """
+        if len(content) > self.max_size:
+            self.too_large += 1
+            return fallback(renderer, content), False
+
+        rendered = await self.run(_render, renderer, content)
+
+        if rendered is None:
+            return fallback(renderer, content), False
+
+        return rendered, True
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "waiting": max(self.queued - self.workers, 0),
+            "renders": self.renders,
+            "too_large": self.too_large,
+            "timed_out": self.timed_out,
+            "broken": self.broken,
+            "restarts": self.restarts,
+        }
+
+
+render_service = RenderService(
+    workers=settings.RENDER_WORKERS,
+    max_size=settings.RENDER_MAX_SIZE,
+    timeout=settings.RENDER_TIMEOUT,
+)
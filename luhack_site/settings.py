@@ -6,3 +6,28 @@ config = Config()
 
 TOKEN_SECRET = config("TOKEN_SECRET", cast=Secret)
 LOG_WEBHOOK = config("LOG_WEBHOOK")
+
+WRITEUPS_PAGE_SIZE = config("WRITEUPS_PAGE_SIZE", cast=int, default=20)
+
+#: how many bytes of rendered html to keep in memory
+RENDER_CACHE_SIZE = config("RENDER_CACHE_SIZE", cast=int, default=32 * 1024 * 1024)
+#: if rendered html should also be stored alongside the content in the database
+RENDER_CACHE_PERSIST = config("RENDER_CACHE_PERSIST", cast=bool, default=True)
+
+#: how many processes to render markdown in, 0 renders in the site process
+RENDER_WORKERS = config("RENDER_WORKERS", cast=int, default=2)
+#: documents longer than this many characters aren't rendered
+RENDER_MAX_SIZE = config("RENDER_MAX_SIZE", cast=int, default=512 * 1024)
+#: renders are given up after this many seconds
+RENDER_TIMEOUT = config("RENDER_TIMEOUT", cast=float, default=2)
+
+#: search results stop being counted past this many
+SEARCH_COUNT_CAP = config("SEARCH_COUNT_CAP", cast=int, default=500)
+
+#: how long anonymous visitors can be served a cached page, in seconds
+PAGE_CACHE_TTL = config("PAGE_CACHE_TTL", cast=float, default=10)
+#: how many pages to keep cached for anonymous visitors
+PAGE_CACHE_SIZE = config("PAGE_CACHE_SIZE", cast=int, default=512)
+
+#: how many users' solved challenges to keep in memory
+SOLVED_CACHE_SIZE = config("SOLVED_CACHE_SIZE", cast=int, default=1024)
@@ -16,8 +16,8 @@ from starlette.staticfiles import StaticFiles
 
 from luhack_site import settings
 from luhack_site.authorization import TokenAuthBackend, can_edit
-from luhack_site.challenges import router as challenge_router
-from luhack_site.images import router as images_router
+from luhack_site.challenges import router as challenge_router, solved_cache
+from luhack_site.images import ORJSONResponse, router as images_router
 from luhack_site.middleware import (
     BlockerMiddleware,
     CSPMiddleware,
@@ -25,6 +25,9 @@ from luhack_site.middleware import (
     WebSecMiddleware,
 )
 from luhack_site.oauth import router as oauth_router
+from luhack_site.page_cache import PageCache, PageCacheMiddleware
+from luhack_site.render_service import render_service
+from luhack_site.sitemap import sitemap_response
 from luhack_site.templater import templates
 from luhack_site.writeups import router as writeups_router
 from luhack_site.sessions import SessionMiddleware
@@ -36,6 +39,8 @@ log.setLevel(logging.INFO)
 
 root_dir = Path(__file__).parent
 
+page_cache = PageCache(maxsize=settings.PAGE_CACHE_SIZE, ttl=settings.PAGE_CACHE_TTL)
+
 app = Starlette(
     routes=[
         Mount("/writeups", app=writeups_router),
@@ -64,6 +69,7 @@ app.add_middleware(
 )
 app.add_middleware(AuthenticationMiddleware, backend=TokenAuthBackend())
 app.add_middleware(SessionMiddleware, secret_key=settings.TOKEN_SECRET)
+app.add_middleware(PageCacheMiddleware, cache=page_cache)
 app.add_middleware(
     BlockerMiddleware,
     checks=[lambda h: "httrack" not in h["user-agent"].lower()],
@@ -116,6 +122,18 @@ async def view_stego(request: HTTPConnection):
     )
 
 
+@app.route("/metrics")
+@requires("admin", redirect="not_admin")
+async def metrics(request: HTTPConnection):
+    return ORJSONResponse(
+        {
+            "page_cache": page_cache.stats(),
+            "solved_cache": solved_cache.stats(),
+            "render_service": render_service.stats(),
+        }
+    )
+
+
 @app.route("/robots.txt")
 async def view_robots(request: HTTPConnection):
     return await statics.get_response("robots.txt", request.scope)
@@ -123,9 +141,22 @@ async def view_robots(request: HTTPConnection):
 
 @app.route("/sitemap.xml")
 async def view_sitemap(request: HTTPConnection):
-    return await statics.get_response("sitemap.xml", request.scope)
+    return await sitemap_response(request)
+
+
+@app.route("/sitemap-{part:int}.xml")
+async def view_sitemap_part(request: HTTPConnection):
+    return await sitemap_response(request, request.path_params["part"])
 
 
 @app.on_event("startup")
 async def startup():
     await init_db()
+    await solved_cache.listen()
+    render_service.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await solved_cache.close()
+    render_service.close()
@@ -0,0 +1,140 @@
+"""Generates sitemap.xml from the public writeups and visible challenges.
+
+Sitemaps are limited to 50k urls, past that /sitemap.xml becomes an index of
+/sitemap-N.xml parts. Generated sitemaps are kept until content changes.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from xml.sax.saxutils import escape
+
+import cachetools
+import sqlalchemy as sa
+from luhack_bot.db.models import Challenge, Writeup, db
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+
+from luhack_site.invalidation import on_content_change
+from luhack_site.utils import abort
+
+#: the most urls a single sitemap may contain
+MAX_URLS = 50_000
+
+#: pages without a row behind them, listed at the start of the first part
+STATIC_VIEWS = ("writeups_index", "challenge_index")
+
+_cache = cachetools.TTLCache(maxsize=64, ttl=60 * 60)
+on_content_change(_cache.clear)
+
+
+def _lastmod(date: datetime) -> str:
+    return date.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+def _entries():
+    """Every public page that has a row behind it, in a stable order."""
+    writeups = db.select(
+        [
+            sa.literal_column("'writeups_view'", sa.Text).label("view"),
+            Writeup.id,
+            Writeup.slug,
+            sa.func.greatest(Writeup.creation_date, Writeup.edit_date).label("lastmod"),
+        ]
+    ).where(sa.not_(Writeup.private))
+
+    challenges = db.select(
+        [
+            sa.literal_column("'challenge_view'", sa.Text).label("view"),
+            Challenge.id,
+            Challenge.slug,
+            sa.func.greatest(Challenge.creation_date, Challenge.edit_date).label(
+                "lastmod"
+            ),
+        ]
+    ).where(sa.not_(Challenge.hidden))
+
+    return sa.union_all(writeups, challenges).alias("entries")
+
+
+async def _part_count() -> int:
+    entries = _entries()
+    rows = await db.select([sa.func.count()]).select_from(entries).gino.scalar()
+
+    return -(-(rows + len(STATIC_VIEWS)) // MAX_URLS)
+
+
+async def _urlset(request: HTTPConnection, part: int) -> bytes:
+    entries = _entries()
+
+    chunks: List[str] = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+
+    if part == 0:
+        for view in STATIC_VIEWS:
+            loc = escape(str(request.url_for(view)))
+            chunks.append(f"<url><loc>{loc}</loc></url>\n")
+
+        offset, limit = 0, MAX_URLS - len(STATIC_VIEWS)
+    else:
+        offset, limit = part * MAX_URLS - len(STATIC_VIEWS), MAX_URLS
+
+    query = (
+        db.select([entries.c.view, entries.c.slug, entries.c.lastmod])
+        .order_by(entries.c.view.desc(), entries.c.id)
+        .offset(offset)
+        .limit(limit)
+    )
+
+    # stream the rows from a cursor instead of loading them all at once
+    async with db.transaction():
+        async for view, slug, lastmod in query.gino.iterate():
+            loc = escape(str(request.url_for(view, slug=slug)))
+            chunks.append(
+                f"<url><loc>{loc}</loc><lastmod>{_lastmod(lastmod)}</lastmod></url>\n"
+            )
+
+    chunks.append("</urlset>\n")
+
+    return "".join(chunks).encode()
+
+
+def _sitemap_index(request: HTTPConnection, parts: int) -> bytes:
+    chunks = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n',
+    ]
+
+    for part in range(parts):
+        loc = escape(str(request.url_for("view_sitemap_part", part=part)))
+        chunks.append(f"<sitemap><loc>{loc}</loc></sitemap>\n")
+
+    chunks.append("</sitemapindex>\n")
+
+    return "".join(chunks).encode()
+
+
+async def sitemap_response(request: HTTPConnection, part: Optional[int] = None):
+    """Respond with the sitemap, or a part of it if `part` is given."""
+    key = (str(request.base_url), part)
+
+    body = _cache.get(key)
+
+    if body is None:
+        parts = await _part_count()
+
+        if part is None:
+            body = (
+                _sitemap_index(request, parts)
+                if parts > 1
+                else await _urlset(request, 0)
+            )
+        elif part < parts:
+            body = await _urlset(request, part)
+        else:
+            return abort(404, "No such sitemap")
+
+        _cache[key] = body
+
+    return Response(body, media_type="application/xml")
@@ -0,0 +1,169 @@
+"""An in-process cache of which challenges each user has solved.
+
+Sets of solved challenge ids are kept per `(discord_id, season)` in an LRU.
+They're kept up to date by listening on the `bot_notification` channel, which
+the completedchallenges triggers notify whenever a solve is added or removed.
+While not listening every lookup goes to the database, and if the listening
+connection drops it's reconnected in the background, backing off between
+attempts.
+"""
+
+import asyncio
+import logging
+from typing import Optional, Set
+
+import cachetools
+import orjson
+from luhack_bot.db.models import CompletedChallenge, db
+
+log = logging.getLogger(__name__)
+
+#: seconds to wait before the first attempt at reconnecting, doubled after
+#: each failed attempt up to `RECONNECT_MAX_DELAY`
+RECONNECT_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+
+class SolvedCache:
+    def __init__(self, maxsize: int):
+        self.entries = cachetools.LRUCache(maxsize=maxsize)
+        #: bumped on every change, so loads racing with a change aren't stored
+        self.generation = 0
+
+        self.conn = None
+        self.raw_conn = None
+        self.reconnecting: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    @property
+    def listening(self) -> bool:
+        return self.raw_conn is not None and not self.raw_conn.is_closed()
+
+    async def get(self, discord_id: int, season: int) -> Set[int]:
+        """The ids of the challenges `discord_id` has solved in `season`."""
+        key = (discord_id, season)
+
+        if self.listening:
+            solved = self.entries.get(key)
+            if solved is not None:
+                self.hits += 1
+                return solved
+
+        self.misses += 1
+        generation = self.generation
+
+        rows = await (
+            db.select([CompletedChallenge.challenge_id])
+            .where(CompletedChallenge.discord_id == discord_id)
+            .where(CompletedChallenge.season == season)
+            .gino.all()
+        )
+        solved = {challenge_id for (challenge_id,) in rows}
+
+        if self.listening and generation == self.generation:
+            self.entries[key] = solved
+
+        return solved
+
+    def add(self, discord_id: int, season: int, challenge_id: int):
+        self.generation += 1
+
+        solved = self.entries.get((discord_id, season))
+        if solved is not None:
+            solved.add(challenge_id)
+
+    def discard(self, discord_id: int, season: int, challenge_id: int):
+        self.generation += 1
+
+        solved = self.entries.get((discord_id, season))
+        if solved is not None:
+            solved.discard(challenge_id)
+
+    def clear(self):
+        self.entries.clear()
+        self.generation += 1
+
+    def handle_notification(self, conn, pid, channel, payload):
+        msg = orjson.loads(payload)
+
+        handler = {
+            "challenge_complete": self.add,
+            "challenge_uncomplete": self.discard,
+        }.get(msg.get("type"))
+
+        if handler is not None:
+            handler(msg["discord_id"], msg["season"], msg["challenge_id"])
+
+    async def listen(self):
+        self.conn = await db.acquire()
+        self.raw_conn = await self.conn.get_raw_connection()
+        await self.raw_conn.add_listener("bot_notification", self.handle_notification)
+        self.raw_conn.add_termination_listener(self.handle_termination)
+
+        # anything loaded before now could have missed a change
+        self.clear()
+
+        log.info("Listening for solves")
+
+    def handle_termination(self, raw_conn):
+        if raw_conn is not self.raw_conn or self.reconnecting is not None:
+            return
+
+        log.warning("Lost the connection listening for solves, reconnecting")
+        self.reconnecting = asyncio.create_task(self.reconnect())
+
+    async def reconnect(self):
+        try:
+            await self.release()
+
+            delay = RECONNECT_DELAY
+            while True:
+                try:
+                    await self.listen()
+                    break
+                except Exception:
+                    log.exception(f"Couldn't listen for solves, retrying in {delay}s")
+                    await self.release()
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+            self.reconnects += 1
+        finally:
+            self.reconnecting = None
+
+    async def release(self):
+        conn, raw_conn = self.conn, self.raw_conn
+        self.conn = self.raw_conn = None
+
+        if raw_conn is not None:
+            raw_conn.remove_termination_listener(self.handle_termination)
+            if not raw_conn.is_closed():
+                await raw_conn.remove_listener(
+                    "bot_notification", self.handle_notification
+                )
+
+        if conn is not None:
+            try:
+                await conn.release()
+            except Exception:
+                # the pool throws away connections that have died anyway
+                log.exception("Couldn't release the connection listening for solves")
+
+    async def close(self):
+        if self.reconnecting is not None:
+            self.reconnecting.cancel()
+            self.reconnecting = None
+
+        await self.release()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "listening": self.listening,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,49 @@
+(function() {
+  const preview = document.getElementById("live-preview");
+  const content = document.getElementById("content");
+
+  // the html of each block we've been sent, by key
+  var blocks = {};
+  var timer = null;
+  var in_flight = false;
+  var again = false;
+
+  function refresh() {
+    if (in_flight) {
+      again = true;
+      return;
+    }
+    in_flight = true;
+
+    fetch(preview.dataset.previewUrl, {
+      method: "POST",
+      credentials: "same-origin",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ content: content.value, have: Object.keys(blocks) })
+    })
+      .then(resp => resp.json())
+      .then(data => {
+        var next = {};
+        data.blocks.forEach(([key, html]) => {
+          next[key] = html === null ? blocks[key] : html;
+        });
+        blocks = next;
+
+        preview.innerHTML = data.blocks.map(([key, _]) => blocks[key]).join("");
+      })
+      .finally(() => {
+        in_flight = false;
+        if (again) {
+          again = false;
+          refresh();
+        }
+      });
+  }
+
+  content.addEventListener("input", function() {
+    clearTimeout(timer);
+    timer = setTimeout(refresh, 300);
+  });
+
+  refresh();
+})();
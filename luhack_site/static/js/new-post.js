@@ -1,21 +1,18 @@
 Dropzone.options.imageUploadDropzone = {
   acceptedFiles: "image/png,image/jpeg,image/jpg,image/gif,image/webp",
   init: function() {
-    var existing_images = JSON.parse(
-      document.getElementById("image-upload-dropzone").dataset.existingImages
-    );
-
     var _this = this;
+    var more_button = document.getElementById("more-images");
 
-    existing_images.forEach(image => {
+    function add_existing_image(image) {
       var mockFile = { name: image.filename, size: 1234, dataURL: image.path };
 
-      this.emit("addedfile", mockFile);
-      this.createThumbnailFromUrl(
+      _this.emit("addedfile", mockFile);
+      _this.createThumbnailFromUrl(
         mockFile,
-        this.options.thumbnailWidth,
-        this.options.thumbnailHeight,
-        this.options.thumbnailMethod,
+        _this.options.thumbnailWidth,
+        _this.options.thumbnailHeight,
+        _this.options.thumbnailMethod,
         true,
         function(dataUrl) {
           _this.emit("thumbnail", mockFile, dataUrl);
@@ -23,7 +20,27 @@ Dropzone.options.imageUploadDropzone = {
           _this.emit("complete", mockFile);
         }
       );
-    });
+    }
+
+    function show_images(page) {
+      page.images.forEach(add_existing_image);
+
+      more_button.hidden = !page.next;
+      more_button.onclick = function() {
+        more_button.disabled = true;
+        fetch(page.next, { credentials: "same-origin" })
+          .then(resp => resp.json())
+          .then(show_images)
+          .finally(() => (more_button.disabled = false));
+      };
+    }
+
+    fetch(this.element.dataset.editorUrl, { credentials: "same-origin" })
+      .then(resp => resp.json())
+      .then(data => {
+        tags_tagify.settings.whitelist.push(...data.tags);
+        show_images(data);
+      });
 
     this.on("success", function(file, resp) {
       var remove_button = Dropzone.createElement("<button>Delete</button>");
@@ -53,9 +70,8 @@ Dropzone.options.imageUploadDropzone = {
 };
 
 const tags_input = document.getElementById("tags");
-const existing_tags = JSON.parse(tags_input.dataset.tagsWhitelist);
 const tags_tagify = new Tagify(tags_input, {
-  whitelist: existing_tags,
+  whitelist: [],
   delimiters: ", ",
   maxTags: 8,
 });
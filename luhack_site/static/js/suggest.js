@@ -0,0 +1,64 @@
+document.addEventListener("DOMContentLoaded", () => {
+    const inputs = document.querySelectorAll("[data-suggest-url]");
+
+    inputs.forEach(input => {
+        const list = document.createElement("ul");
+        list.className = "suggestions";
+        list.hidden = true;
+        input.insertAdjacentElement("afterend", list);
+
+        const addItem = (text, href, className) => {
+            const item = document.createElement("li");
+            const link = document.createElement("a");
+            link.className = className;
+            link.href = href;
+            link.textContent = text;
+            item.appendChild(link);
+            list.appendChild(item);
+        };
+
+        let timeout = null;
+        let controller = null;
+
+        const update = async () => {
+            const q = input.value.trim();
+
+            if (controller) {
+                controller.abort();
+            }
+
+            if (!q) {
+                list.hidden = true;
+                return;
+            }
+
+            controller = new AbortController();
+
+            const url = new URL(input.dataset.suggestUrl, window.location.href);
+            url.searchParams.set("q", q);
+
+            let data;
+            try {
+                const resp = await fetch(url, { signal: controller.signal });
+                data = await resp.json();
+            } catch (e) {
+                return;
+            }
+
+            list.replaceChildren();
+            data.titles.forEach(([title, href]) => addItem(title, href, ""));
+            data.tags.forEach(([tag, href]) => addItem(tag, href, "post-category"));
+            list.hidden = !list.childElementCount;
+        };
+
+        input.addEventListener("input", () => {
+            clearTimeout(timeout);
+            timeout = setTimeout(update, 150);
+        });
+
+        input.addEventListener("blur", () => {
+            // let clicks on the suggestions land first
+            setTimeout(() => { list.hidden = true; }, 200);
+        });
+    });
+});
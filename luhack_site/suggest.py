@@ -0,0 +1,59 @@
+"""Helpers for the typeahead suggestion endpoints of writeups and challenges.
+
+Titles and tags are matched on prefix (ILIKE) or trigram similarity (%), both
+of which are served by the gin_trgm_ops indexes on the title and tag columns.
+"""
+
+from typing import List, Tuple
+
+import sqlalchemy as sa
+from starlette.requests import HTTPConnection
+
+from luhack_site.images import ORJSONResponse
+
+#: how many titles and tags to suggest
+SUGGEST_LIMIT = 8
+#: longer queries are truncated to this
+MAX_QUERY_LENGTH = 64
+
+
+def normalise_query(q: str) -> str:
+    return q.strip().lower()[:MAX_QUERY_LENGTH]
+
+
+def _escape_like(s: str) -> str:
+    # not backslash, as how that's quoted depends on standard_conforming_strings
+    return s.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def ranked_matches(query, column, q: str):
+    """Restrict `query` to the best few rows where `column` matches `q`."""
+    matches = sa.or_(column.ilike(_escape_like(q) + "%", escape="!"), column.op("%")(q))
+
+    return (
+        query.where(matches)
+        .order_by(sa.func.similarity(column, q).desc(), column)
+        .limit(SUGGEST_LIMIT)
+    )
+
+
+def suggestions_response(
+    request: HTTPConnection,
+    titles: List[Tuple[str, str]],
+    tags: List[str],
+    view: str,
+    tag_view: str,
+):
+    """Respond with the suggested `(title, slug)` pairs and tags.
+
+    `view` and `tag_view` are the route names to link them to.
+    """
+    return ORJSONResponse(
+        {
+            "titles": [
+                [title, request.url_for(view, slug=slug).path]
+                for (title, slug) in titles
+            ],
+            "tags": [[tag, request.url_for(tag_view, tag=tag).path] for tag in tags],
+        }
+    )
@@ -1,3 +1,5 @@
+import math
+
 from starlette.responses import PlainTextResponse, RedirectResponse
 
 def redirect_response(*args, **kwargs):
@@ -6,3 +8,11 @@ def redirect_response(*args, **kwargs):
 
 def abort(status: int, reason: str = ""):
     return PlainTextResponse(reason, status)
+
+def too_many_requests(retry_after: float):
+    seconds = math.ceil(retry_after)
+    return PlainTextResponse(
+        f"Slow down, try again in {seconds} seconds.",
+        429,
+        headers={"Retry-After": str(seconds)},
+    )
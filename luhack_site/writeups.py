@@ -1,7 +1,11 @@
-import orjson
+import asyncio
+
+import cachetools
 import sqlalchemy as sa
-from luhack_bot.db.helpers import text_search
-from luhack_bot.db.models import User, Writeup, db
+from gino.loader import ColumnLoader
+from luhack_bot.db.helpers import tag_counts, text_search
+from luhack_bot.db.models import ContentConflict, Tag, User, Writeup, db
+from luhack_bot.utils.async_cache import async_cached
 from slug import slug
 from sqlalchemy_searchable import search_manager
 from starlette.authentication import requires
@@ -9,60 +13,137 @@ from starlette.endpoints import HTTPEndpoint
 from starlette.requests import HTTPConnection
 from starlette.routing import Router
 
+from luhack_site import settings
 from luhack_site.authorization import can_edit
+from luhack_site.conditional import make_etag, not_modified, set_validators
 from luhack_site.content_logger import log_create, log_delete, log_edit
-from luhack_site.forms import WriteupForm
-from luhack_site.images import encoded_existing_images
-from luhack_site.markdown import (
-    highlight_markdown,
-    length_constrained_plaintext_markdown,
-)
+from luhack_site.feeds import FEED_SIZE, FeedEntry, feed_response
+from luhack_site.forms import WriteupForm, add_conflict_errors
+from luhack_site.images import editor_bootstrap
+from luhack_site.invalidation import content_changed, on_content_change
+from luhack_site.live_preview import preview_response
+from luhack_site.pagination import OffsetPage, Page, keyset_paginate, page_number
+from luhack_site.render_cache import render_stored, rendered_columns
+from luhack_site.render_service import render_service
+from luhack_site.suggest import normalise_query, ranked_matches, suggestions_response
 from luhack_site.templater import templates
 from luhack_site.utils import abort, redirect_response
 
 router = Router()
 
 
-def should_skip_writeup(w: Writeup, is_authed: bool) -> bool:
-    return w.private and not is_authed
+def writeup_visibility(is_authed: bool):
+    return True if is_authed else sa.not_(Writeup.private)
 
 
-@router.route("/")
-async def writeups_index(request: HTTPConnection):
-    latest = (
-        await Writeup.load(author=User)
-        .order_by(sa.desc(Writeup.creation_date))
-        .gino.all()
+#: the columns that writeup previews display
+listing_columns = (
+    Writeup.id,
+    Writeup.author_id,
+    Writeup.title,
+    Writeup.slug,
+    Writeup.tags,
+    Writeup.preview,
+    Writeup.creation_date,
+    Writeup.edit_date,
+)
+
+
+def writeup_listing():
+    """Load only the columns that writeup previews display."""
+    return Writeup.load(
+        *listing_columns, author=User.load(User.discord_id, User.username)
     )
 
-    rendered = [
-        (w, length_constrained_plaintext_markdown(w.content))
-        for w in latest
-        if not should_skip_writeup(w, request.user.is_authed)
-    ]
 
-    return templates.TemplateResponse(
-        "writeups/index.j2", {"request": request, "writeups": rendered}
+def writeup_version(w: Writeup):
+    """What changes whenever a listing showing `w` should be re-rendered.
+
+    Taken from the columns themselves rather than just `edit_date`, which
+    writes that don't go through `update_auto` leave alone.
+    """
+    return (
+        w.id,
+        w.edit_date,
+        w.title,
+        w.tags,
+        w.preview,
+        w.author_id and w.author.username,
     )
 
 
+def listing_response(request: HTTPConnection, page: Page):
+    etag = make_etag(
+        request,
+        [writeup_version(w) for w in page.items],
+        page.prev_cursor,
+        page.next_cursor,
+    )
+    dates = [d for w in page.items for d in (w.creation_date, w.edit_date)]
+
+    # deleting or hiding a writeup shifts an older one onto the page without
+    # moving the dates
+    response = not_modified(request, etag, *dates, check_dates=False)
+    if response is not None:
+        return response
+
+    rendered = [(w, w.preview) for w in page.items]
+
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "writeups/index.j2",
+            {"request": request, "writeups": rendered, "page": page},
+        ),
+        etag,
+        *dates,
+    )
+
+
+@router.route("/")
+async def writeups_index(request: HTTPConnection):
+    page = await keyset_paginate(
+        request,
+        writeup_listing().where(writeup_visibility(request.user.is_authed)),
+        Writeup.creation_date,
+        Writeup.id,
+    )
+
+    return listing_response(request, page)
+
+
 @router.route("/view/{slug}")
 async def writeups_view(request: HTTPConnection):
     slug = request.path_params["slug"]
 
-    writeup = await Writeup.load(author=User).where(Writeup.slug == slug).gino.first()
+    writeup = await (
+        Writeup.load(author=User.load_public()).where(Writeup.slug == slug).gino.first()
+    )
 
     if writeup is None:
         return abort(404, "Writeup not found")
 
-    if should_skip_writeup(writeup, request.user.is_authed):
+    if writeup.private and not request.user.is_authed:
         return redirect_response(url=request.url_for("need_auth"))
 
-    rendered = highlight_markdown(writeup.content)
+    etag = make_etag(request, writeup_version(writeup), writeup.content)
+    dates = (writeup.creation_date, writeup.edit_date)
 
-    return templates.TemplateResponse(
-        "writeups/view.j2",
-        {"writeup": writeup, "request": request, "rendered": rendered},
+    # writes outside `update_auto` and author renames don't move the dates
+    response = not_modified(request, etag, *dates, check_dates=False)
+    if response is not None:
+        return response
+
+    rendered = await render_stored("highlight", writeup)
+
+    return set_validators(
+        request,
+        templates.TemplateResponse(
+            "writeups/view.j2",
+            {"writeup": writeup, "request": request, "rendered": rendered},
+        ),
+        etag,
+        *dates,
     )
 
 
@@ -70,66 +151,45 @@ async def writeups_view(request: HTTPConnection):
 async def writeups_by_tag(request: HTTPConnection):
     tag = request.path_params["tag"]
 
-    writeups = (
-        await Writeup.load(author=User)
+    page = await keyset_paginate(
+        request,
+        writeup_listing()
         .where(Writeup.tags.contains([tag]))
-        .order_by(sa.desc(Writeup.creation_date))
-        .gino.all()
+        .where(writeup_visibility(request.user.is_authed)),
+        Writeup.creation_date,
+        Writeup.id,
     )
 
-    rendered = [
-        (w, length_constrained_plaintext_markdown(w.content))
-        for w in writeups
-        if not should_skip_writeup(w, request.user.is_authed)
-    ]
+    if not page.items:
+        return abort(404, "Tag not found")
 
-    return templates.TemplateResponse(
-        "writeups/index.j2", {"request": request, "writeups": rendered}
-    )
+    return listing_response(request, page)
 
 
 @router.route("/user/{user}")
 async def writeups_by_user(request: HTTPConnection):
     user = request.path_params["user"]
 
-    writeups = (
-        await Writeup.load(author=User)
+    page = await keyset_paginate(
+        request,
+        writeup_listing()
         .where(User.username == user)
-        .order_by(sa.desc(Writeup.creation_date))
-        .gino.all()
-    )
-
-    rendered = [
-        (w, length_constrained_plaintext_markdown(w.content))
-        for w in writeups
-        if not should_skip_writeup(w, request.user.is_authed)
-    ]
-
-    return templates.TemplateResponse(
-        "writeups/index.j2", {"request": request, "writeups": rendered}
+        .where(writeup_visibility(request.user.is_authed)),
+        Writeup.creation_date,
+        Writeup.id,
     )
 
+    return listing_response(request, page)
 
-async def get_all_tags(allow_private: bool = False):
-    private_filt = True if allow_private else sa.not_(Writeup.private)
 
+@router.route("/tags")
+async def writeups_all_tags(request: HTTPConnection):
     tags = (
-        await sa.select([sa.column("tag")])
-        .select_from(Writeup)
-        .select_from(sa.func.unnest(Writeup.tags).alias("tag"))
-        .where(private_filt)
-        .group_by(sa.column("tag"))
-        .order_by(sa.func.count())
+        await tag_counts("writeup", request.user.is_authed)
+        .order_by(sa.column("count"))
         .gino.all()
     )
 
-    return [i for (i,) in tags]
-
-
-@router.route("/tags")
-async def writeups_all_tags(request: HTTPConnection):
-    tags = await get_all_tags()
-
     return templates.TemplateResponse(
         "writeups/tag_list.j2", {"request": request, "tags": tags}
     )
@@ -139,57 +199,163 @@ async def writeups_all_tags(request: HTTPConnection):
 async def writeups_search(request: HTTPConnection):
     s_query = request.query_params.get("search", "")
 
-    # sorry about this
+    page_size = settings.WRITEUPS_PAGE_SIZE
+    number = page_number(request)
+
+    ts_query = sa.func.parse_websearch(search_manager.options["regconfig"], s_query)
+    rank = sa.func.ts_rank_cd(Writeup.search_vector, ts_query).label("rank")
 
-    query = text_search(
-        Writeup.join(User).select(), s_query, sort=True, vector=Writeup.search_vector
+    def matching(*columns):
+        return text_search(
+            db.select(columns).where(writeup_visibility(request.user.is_authed)),
+            s_query,
+            vector=Writeup.search_vector,
+        )
+
+    # rank everything but only fetch (and build headlines for) the current page
+    matches = (
+        matching(Writeup.id, rank)
+        .order_by(rank.desc(), Writeup.id.desc())
+        .limit(page_size + 1)
+        .offset((number - 1) * page_size)
+        .alias("matches")
     )
-    query = query.column(
-        sa.func.ts_headline(
-            Writeup.content,
-            sa.func.parse_websearch(search_manager.options["regconfig"], s_query),
-            f"StartSel=**,StopSel=**,MaxWords=70,MinWords=30,MaxFragments=3",
-        ).label("headline")
+
+    headline = sa.func.ts_headline(
+        Writeup.content,
+        ts_query,
+        f"StartSel=**,StopSel=**,MaxWords=70,MinWords=30,MaxFragments=3",
+    ).label("headline")
+
+    writeups = await (
+        db.select([*listing_columns, User.discord_id, User.username, headline])
+        .select_from(
+            matches.join(Writeup, Writeup.id == matches.c.id).outerjoin(
+                User, User.discord_id == Writeup.author_id
+            )
+        )
+        .order_by(matches.c.rank.desc(), matches.c.id.desc())
+        .gino.load((writeup_listing(), ColumnLoader(headline)))
+        .all()
     )
 
-    writeups = await query.as_scalar().gino.all()
+    count_cap = settings.SEARCH_COUNT_CAP
+    count = await (
+        db.select([sa.func.count()])
+        .select_from(matching(Writeup.id).limit(count_cap).alias("counted"))
+        .gino.scalar()
+    )
 
-    def build_writeup(w):
-        """we get back a RowProxy so manually construct the writeup from it."""
+    page = OffsetPage(
+        writeups[:page_size],
+        number=number,
+        has_next=len(writeups) > page_size,
+        count=count,
+        count_cap=count_cap,
+    )
 
-        author = User(discord_id=w.discord_id, username=w.username, email=w.email)
+    headlines = await asyncio.gather(
+        *(render_service.render("preview", headline) for (_, headline) in page.items)
+    )
+    rendered = [(w, headline) for ((w, _), (headline, _)) in zip(page.items, headlines)]
+
+    return templates.TemplateResponse(
+        "writeups/index.j2",
+        {"request": request, "writeups": rendered, "query": s_query, "page": page},
+    )
+
+
+@async_cached(cache=cachetools.TTLCache(maxsize=1024, ttl=60))
+async def suggest_writeups(q: str, include_private: bool):
+    titles = await ranked_matches(
+        db.select([Writeup.title, Writeup.slug]).where(
+            writeup_visibility(include_private)
+        ),
+        Writeup.title,
+        q,
+    ).gino.all()
+
+    tags = await ranked_matches(
+        tag_counts("writeup", include_private), Tag.tag, q
+    ).gino.all()
+
+    return [(title, slug) for (title, slug) in titles], [tag for (tag, _) in tags]
+
+
+on_content_change(suggest_writeups.clear)
+
+
+@router.route("/suggest")
+async def writeups_suggest(request: HTTPConnection):
+    q = normalise_query(request.query_params.get("q", ""))
+
+    titles, tags = await suggest_writeups(q, request.user.is_authed) if q else ([], [])
 
-        writeup = Writeup(
-            id=w.id,
-            author_id=w.author_id,
+    return suggestions_response(
+        request, titles, tags, "writeups_view", "writeups_by_tag"
+    )
+
+
+async def writeups_feed_entries(request: HTTPConnection, tag: str = None):
+    query = writeup_listing().where(sa.not_(Writeup.private))
+
+    if tag is not None:
+        query = query.where(Writeup.tags.contains([tag]))
+
+    writeups = (
+        await query.order_by(Writeup.creation_date.desc(), Writeup.id.desc())
+        .limit(FEED_SIZE)
+        .gino.all()
+    )
+
+    return [
+        FeedEntry(
             title=w.title,
-            slug=w.slug,
+            url=str(request.url_for("writeups_view", slug=w.slug)),
+            published=w.creation_date,
+            updated=max(w.creation_date, w.edit_date),
+            summary=w.preview,
             tags=w.tags,
-            content=w.content,
-            creation_date=w.creation_date,
-            edit_date=w.edit_date,
+            author=w.author_id and w.author.username,
         )
-
-        writeup.author = author
-        return writeup
-
-    writeups = [
-        (build_writeup(w), w.headline)
         for w in writeups
-        if not should_skip_writeup(w, request.user.is_authed)
     ]
 
-    rendered = [
-        (w, length_constrained_plaintext_markdown(headline))
-        for (w, headline) in writeups
-    ]
 
-    return templates.TemplateResponse(
-        "writeups/index.j2",
-        {"request": request, "writeups": rendered, "query": s_query},
+@router.route("/feed.atom")
+async def writeups_feed(request: HTTPConnection):
+    return feed_response(
+        request,
+        "LUHack Writeups",
+        str(request.url_for("writeups_index")),
+        await writeups_feed_entries(request),
     )
 
 
+@router.route("/tag/{tag}/feed.atom")
+async def writeups_tag_feed(request: HTTPConnection):
+    tag = request.path_params["tag"]
+
+    return feed_response(
+        request,
+        f"LUHack Writeups tagged {tag}",
+        str(request.url_for("writeups_by_tag", tag=tag)),
+        await writeups_feed_entries(request, tag),
+    )
+
+
+@router.route("/editor.json")
+@requires("authenticated", redirect="need_auth")
+async def writeups_editor(request: HTTPConnection):
+    return await editor_bootstrap(request, "writeup")
+
+
+@router.route("/preview", methods=["POST"])
+@requires("authenticated", redirect="need_auth")
+async def writeups_preview(request: HTTPConnection):
+    return await preview_response(request, "highlight")
+
+
 @router.route("/delete/{id:int}")
 @requires("authenticated", redirect="need_auth")
 async def writeups_delete(request: HTTPConnection):
@@ -204,6 +370,7 @@ async def writeups_delete(request: HTTPConnection):
         return abort(400)
 
     await writeup.delete()
+    content_changed()
 
     await log_delete("writeup", writeup.title, request.user.username)
 
@@ -216,16 +383,11 @@ class NewWriteup(HTTPEndpoint):
     async def get(self, request: HTTPConnection):
         form = WriteupForm()
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(True))
-
         return templates.TemplateResponse(
             "writeups/new.j2",
             {
                 "request": request,
                 "form": form,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -243,44 +405,31 @@ class NewWriteup(HTTPEndpoint):
                 "A valid url-safe name cannot be generated for this title."
             )
 
-        if (
-            await Writeup.query.where(
-                sa.or_(
-                    Writeup.title == form.title.data,
-                    Writeup.slug == slug(form.title.data),
-                )
-            ).gino.first()
-            is not None
-        ):
-            is_valid = False
-            form.title.errors.append(
-                f"A writeup with the title conflicting with '{form.title.data}' already exists."
-            )
-
         if is_valid:
-            writeup = await Writeup.create_auto(
-                author_id=request.user.discord_id,
-                title=form.title.data,
-                tags=form.tags.data,
-                content=form.content.data,
-                private=form.private.data,
-            )
-
-            url = request.url_for("writeups_view", slug=writeup.slug)
-            await log_create("writeup", writeup.title, request.user.username, url)
+            try:
+                writeup = await Writeup.create_auto(
+                    author_id=request.user.discord_id,
+                    title=form.title.data,
+                    tags=form.tags.data,
+                    content=form.content.data,
+                    private=form.private.data,
+                    **await rendered_columns("highlight", form.content.data),
+                )
+            except ContentConflict as e:
+                add_conflict_errors(form, e.columns, "writeup")
+            else:
+                content_changed()
 
-            return redirect_response(url=url)
+                url = request.url_for("writeups_view", slug=writeup.slug)
+                await log_create("writeup", writeup.title, request.user.username, url)
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(True))
+                return redirect_response(url=url)
 
         return templates.TemplateResponse(
             "writeups/new.j2",
             {
                 "request": request,
                 "form": form,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -306,17 +455,12 @@ class EditWriteup(HTTPEndpoint):
             private=writeup.private,
         )
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(True))
-
         return templates.TemplateResponse(
             "writeups/edit.j2",
             {
                 "request": request,
                 "form": form,
                 "writeup": writeup,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )
 
@@ -344,36 +488,24 @@ class EditWriteup(HTTPEndpoint):
                 "A valid url-safe name cannot be generated for this title."
             )
 
-        if writeup.title != form.title.data:
-            if (
-                await Writeup.query.where(
-                    sa.or_(
-                        Writeup.title == form.title.data,
-                        Writeup.slug == slug(form.title.data),
-                    )
-                ).gino.first()
-                is not None
-            ):
-                is_valid = False
-                form.title.errors.append(
-                    f"A writeup with the title conflicting with '{form.title.data}' already exists."
-                )
-
         if is_valid:
-            await writeup.update_auto(
-                title=form.title.data,
-                tags=form.tags.data,
-                content=form.content.data,
-                private=form.private.data,
-            ).apply()
-
-            url = request.url_for("writeups_view", slug=writeup.slug)
-            await log_edit("writeup", writeup.title, request.user.username, url)
+            try:
+                await writeup.update_auto(
+                    title=form.title.data,
+                    tags=form.tags.data,
+                    content=form.content.data,
+                    private=form.private.data,
+                    **await rendered_columns("highlight", form.content.data),
+                )
+            except ContentConflict as e:
+                add_conflict_errors(form, e.columns, "writeup")
+            else:
+                content_changed()
 
-            return redirect_response(url=url)
+                url = request.url_for("writeups_view", slug=writeup.slug)
+                await log_edit("writeup", writeup.title, request.user.username, url)
 
-        images = await encoded_existing_images(request)
-        tags = orjson.dumps(await get_all_tags(True))
+                return redirect_response(url=url)
 
         return templates.TemplateResponse(
             "writeups/edit.j2",
@@ -381,7 +513,5 @@ class EditWriteup(HTTPEndpoint):
                 "request": request,
                 "form": form,
                 "writeup": writeup,
-                "existing_images": images,
-                "existing_tags": tags,
             },
         )